@@ -1,19 +1,57 @@
+import settings  # loads .env once, before the modules below read their settings
+
 import re
-import io
-import pdfplumber
+import json
+import time
+import asyncio
 from typing import List
+from contextlib import asynccontextmanager, aclosing
 
-from fastapi import FastAPI, Request, UploadFile, File
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from sse_starlette.sse import EventSourceResponse
 
-import embeddings
 import vector_store
 import prompting
-import dynamic_prompting
-from rag_engine import query_with_rag, add_document
+import gemini_client
+import ingestion
+import response_cache
+import embedding_cache
+import llm_cache
+import jobs
+import tokenization
+from rag_engine import (
+    query_with_rag_async,
+    retrieve_async,
+    build_rag_prompt,
+    sources_from_results,
+)
+
+
+_warmup = None
+
+
+def _warm_up():
+    """Loads the vector store, then the tokenizer, so the first requests don't pay for either."""
+    vector_store.warm_up()
+    tokenization.get_tokenizer()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _warmup
+    await jobs.start_workers()
+    # Load the vector store and tokenizer in the background: the server accepts
+    # requests right away and /ready reports when the index is in memory.
+    _warmup = asyncio.create_task(asyncio.to_thread(_warm_up))
+    yield
+    await jobs.stop_workers()
+    ingestion.shutdown_pdf_pool()
+    await gemini_client.aclose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS middleware for frontend origin (adjust port if needed)
 app.add_middleware(
@@ -48,6 +86,33 @@ def parse_quiz(llm_output):
             })
     return quiz
 
+@app.get("/ready")
+async def ready_endpoint():
+    """
+    Readiness: 200 {"status": "ready"} once the vector store is loaded,
+    503 {"status": "accepting"} while the server is up but still loading it
+    (or "error" if loading failed). Includes vector_store.load_stats().
+    """
+    stats = vector_store.load_stats()
+    if stats["loaded"]:
+        return {"status": "ready", "index": stats}
+    body = {"status": "accepting", "index": stats}
+    if _warmup is not None and _warmup.done() and _warmup.exception() is not None:
+        body = {"status": "error", "error": str(_warmup.exception()), "index": stats}
+    return JSONResponse(status_code=503, content=body)
+
+
+@app.get("/stats")
+async def stats_endpoint():
+    """Cache hit rates and Gemini latency, for monitoring."""
+    return {
+        "response_cache": response_cache.cache_stats(),
+        "embedding_cache": embedding_cache.cache_stats(),
+        "llm_cache": llm_cache.cache_stats(),
+        "gemini": gemini_client.latency_stats(),
+    }
+
+
 @app.post("/chat")
 async def chat_endpoint(request: Request):
     print("Received chat request")
@@ -57,7 +122,7 @@ async def chat_endpoint(request: Request):
     print("Query:", query, "Intent:", intent)
 
     try:
-        answer = query_with_rag(query, conversation_history=None, intent=intent)
+        answer = await query_with_rag_async(query, conversation_history=None, intent=intent)
         print("RAG output:", answer)
 
         if intent == "quiz":
@@ -81,78 +146,67 @@ async def chat_endpoint(request: Request):
 
 
 
-@app.post("/upload")
+@app.post("/upload", status_code=202)
 async def upload_endpoint(file: UploadFile = File(...)):
-    filename = file.filename.lower()
-    content = await file.read()
-    text = ""
-
-    if filename.endswith(".pdf"):
-        with pdfplumber.open(io.BytesIO(content)) as pdf:
-            pages = [page.extract_text() or "" for page in pdf.pages]
-            text = "\n".join(pages)
-    elif filename.endswith(".txt"):
-        text = content.decode("utf-8", errors="ignore")
-    else:
-        return {"error": "Unsupported file format. Please upload PDF or TXT."}
-
-    # Chunk text and embed + index
-    chunks = [text[i : i + 800] for i in range(0, len(text), 800)]
-
-    for i, chunk in enumerate(chunks):
-        embedding = embeddings.generate_embedding(chunk)
-        metadata_item = {
-            "text": chunk,
-            "doc_id": f"{file.filename}-{i}",
-            "source": file.filename,
-        }
-        vector_store.add_document_embedding(embedding, metadata_item)
-
-    return {"status": "success", "chunks_added": len(chunks)}
+    """Queues the file for background ingestion; poll /jobs/{job_id} for progress."""
+    if not ingestion.is_supported(file.filename):
+        return JSONResponse(status_code=400, content={"error": "Unsupported file format. Please upload PDF or TXT."})
+
+    # Copied from the upload's temp file in blocks, never read into memory whole.
+    job_id = await asyncio.to_thread(jobs.submit, file.filename, file.file)
+    return {"status": "queued", "job_id": job_id}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    job = await asyncio.to_thread(jobs.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @app.post("/upload-multi")
 async def upload_multi_endpoint(files: List[UploadFile] = File(...)):
-    total_chunks = 0
-    for file in files:
-        content = await file.read()
-        text = ""
-        if file.filename.lower().endswith(".pdf"):
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                pages = [page.extract_text() or "" for page in pdf.pages]
-                text = "\n".join(pages)
-        elif file.filename.lower().endswith(".txt"):
-            text = content.decode("utf-8", errors="ignore")
-        # Further formats can be added here
-
-        chunks = [text[i : i + 800] for i in range(0, len(text), 800)]
-
-        for i, chunk in enumerate(chunks):
-            embedding = embeddings.generate_embedding(chunk)
-            metadata_item = {
-                "text": chunk,
-                "doc_id": f"{file.filename}-{i}",
-                "source": file.filename,
-            }
-            vector_store.add_document_embedding(embedding, metadata_item)
-        total_chunks += len(chunks)
-
-    return {"status": "success", "total_chunks_added": total_chunks}
-
-
-async def your_llm_stream(query):
-    # Example placeholder for your streaming LLM API call.
-    # Replace with real streaming call to your LLM provider.
-    async for partial in llm_api.stream_generate(query):
-        yield partial
+    # Parsing, embedding and indexing of the files overlap (see ingestion.py).
+    uploads = [(file.filename, file.file) for file in files]
+    report = await ingestion.ingest_files(uploads)
+    return {
+        "status": "success",
+        "total_chunks_added": report["chunks_added"],
+        "duplicate_chunks_skipped": report["chunks_skipped"],
+        "pipeline": report["stages"],
+    }
 
 
 @app.get("/chat-stream")
 async def chat_stream(request: Request):
+    """
+    Streams a RAG answer over SSE: a "sources" event with the retrieved
+    sources, then "token" events as Gemini generates, then a "done" event
+    with time-to-first-token. If the client disconnects, the upstream Gemini
+    request is closed.
+    """
     query = request.query_params.get("query", "")
+    intent = request.query_params.get("intent", "summary")
+
     async def event_generator():
-        async for chunk in your_llm_stream(query):
-            yield {"data": chunk}
-            if await request.is_disconnected():
-                break
+        start = time.perf_counter()
+        results = await retrieve_async(query)
+        yield {"event": "sources", "data": json.dumps(sources_from_results(results))}
+
+        # Token counting can be slow (tokenizer load, Gemini countTokens); keep it off the loop.
+        system_prompt, prompt_text = await asyncio.to_thread(build_rag_prompt, query, results, intent=intent)
+        first_token_ms = None
+        async with aclosing(prompting.system_user_prompt_stream(system_prompt, prompt_text)) as tokens:
+            async for token in tokens:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                    print(f"chat-stream time to first token: {first_token_ms:.0f} ms")
+                yield {"event": "token", "data": token}
+                if await request.is_disconnected():
+                    return
+
+        total_ms = (time.perf_counter() - start) * 1000
+        yield {"event": "done", "data": json.dumps({"ttft_ms": first_token_ms, "total_ms": total_ms})}
+
     return EventSourceResponse(event_generator())
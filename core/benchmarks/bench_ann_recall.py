@@ -0,0 +1,91 @@
+"""
+core/benchmarks/bench_ann_recall.py
+===================================
+Recall@k vs. query latency of the approximate index types against the
+exact flat index, to pick INDEX_TYPE / HNSW_EF_SEARCH / IVF_NPROBE with data.
+
+Vectors are synthetic: gaussian clusters (so neighbourhoods look more like
+real embeddings than uniform noise), queries are perturbed corpus points.
+With --metric cosine (the default for new stores) both are normalized and
+the indexes use inner product, as in vector_store.
+
+Run from the core folder:
+    python benchmarks/bench_ann_recall.py --n 200000 --dim 3072 --k 3
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import vector_store
+
+
+def make_corpus(n, dim, n_queries, rng):
+    centers = rng.standard_normal((max(1, n // 100), dim), dtype=np.float32)
+    corpus = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim), dtype=np.float32)
+    queries = corpus[rng.integers(0, n, n_queries)] + 0.1 * rng.standard_normal((n_queries, dim), dtype=np.float32)
+    return corpus, queries
+
+
+def time_queries(idx, queries, k):
+    """Runs queries one at a time, like /chat does; returns (ids, per-query seconds)."""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, found = idx.search(q[None, :], k)
+        latencies[i] = time.perf_counter() - start
+        ids[i] = found[0]
+    return ids, latencies
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def report(label, found, latencies, truth):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{label:<22} {recall_at_k(found, truth):>9.3f} {p50:>9.2f} {p99:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--metric", choices=vector_store.METRICS, default=vector_store.DEFAULT_METRIC)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus, queries = make_corpus(args.n, args.dim, args.queries, rng)
+    if args.metric == "cosine":
+        corpus, queries = vector_store.normalize_vectors(corpus), vector_store.normalize_vectors(queries)
+    vector_store.metric = args.metric
+    print(f"n={args.n} dim={args.dim} queries={args.queries} k={args.k} metric={args.metric}")
+    print(f"{'index':<22} {'recall@k':>9} {'p50 ms':>9} {'p99 ms':>9}")
+
+    flat = vector_store.build_index("flat", corpus)
+    truth, latencies = time_queries(flat, queries, args.k)
+    report("flat (exact)", truth, latencies, truth)
+
+    for index_type, knob, values in (("hnsw", "ef_search", args.ef_search), ("ivf", "nprobe", args.nprobe)):
+        start = time.perf_counter()
+        idx = vector_store.build_index(index_type, corpus)
+        print(f"-- {index_type} build/train: {time.perf_counter() - start:.1f}s")
+        for value in values:
+            vector_store.set_search_params(target=idx, **{knob: value})
+            found, latencies = time_queries(idx, queries, args.k)
+            report(f"{index_type} {knob}={value}", found, latencies, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+core/benchmarks/bench_async_load.py
+===================================
+Throughput of /chat on a single uvicorn worker at 1, 10 and 50 concurrent
+clients, against a stubbed Gemini (no API key or network needed).
+
+"blocking" is a route that calls the synchronous query_with_rag from an
+async handler, as /chat used to; "async" is the real /chat endpoint on
+query_with_rag_async. The stub sleeps --embed-ms per embedding call and
+--generate-ms per generation call to stand in for Gemini latency.
+
+Run from the core folder:
+    python benchmarks/bench_async_load.py --concurrency 1 10 50
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ["EMBEDDING_CACHE"] = "0"  # every query must reach the stub
+os.chdir(tempfile.mkdtemp(prefix="bench_async_"))  # empty vector store
+
+import httpx
+import uvicorn
+from fastapi import Request
+
+import api
+import prompting
+import embeddings
+import rag_engine
+
+
+class StubGemini(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    embed_seconds = 0.05
+    generate_seconds = 0.5
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith(":embedContent"):
+            time.sleep(self.embed_seconds)
+            body = {"embedding": {"values": [0.1] * 8}}
+        else:
+            time.sleep(self.generate_seconds)
+            body = {"candidates": [{"content": {"parts": [{"text": "stub answer"}]}}]}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@api.app.post("/chat-blocking")
+async def chat_blocking(request: Request):
+    data = await request.json()
+    return {"type": "text", "response": rag_engine.query_with_rag(data["query"]), "sources": []}
+
+
+async def load(url, concurrency, total):
+    latencies = []
+    counter = iter(range(total))
+
+    async def client_loop(client):
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.post(url, json={"query": f"question {i}", "intent": "summary"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return total / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--embed-ms", type=float, default=50)
+    parser.add_argument("--generate-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    StubGemini.embed_seconds = args.embed_ms / 1000
+    StubGemini.generate_seconds = args.generate_ms / 1000
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubGemini)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub_base = f"http://127.0.0.1:{stub.server_port}/v1beta/models"
+    prompting.GEMINI_URL = f"{stub_base}/gemini-2.0-flash:generateContent"
+    embeddings.GEMINI_EMBEDDING_URL = f"{stub_base}/gemini-embedding-001:embedContent"
+
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=0, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    # api.py logs every request to stdout; keep the report readable.
+    report, sys.stdout = sys.stdout, open(os.devnull, "w")
+    print(f"stub latency: embed {args.embed_ms} ms, generate {args.generate_ms} ms; one uvicorn worker", file=report)
+    print(f"{'endpoint':<10} {'clients':>8} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}", file=report)
+    for route, label in (("/chat-blocking", "blocking"), ("/chat", "async")):
+        for concurrency in args.concurrency:
+            total = concurrency * args.requests_per_client
+            rps, p50, p99 = asyncio.run(load(base + route, concurrency, total))
+            print(f"{label:<10} {concurrency:>8} {rps:>8.1f} {p50:>9.0f} {p99:>9.0f}", file=report)
+
+    server.should_exit = True
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+core/benchmarks/bench_chunking.py
+=================================
+Chunking throughput in MB/s: the old fixed 800-character slicing vs. the
+token-aware chunker in chunking.py, split into the batched tokenizer call
+and the boundary snapping on top of it. Also reports the token-count spread
+of the chunks each method produces.
+
+The corpus is generated prose with sentence and paragraph breaks, fed in
+--block-kb pieces the way ingestion reads TXT uploads.
+
+Run from the core folder:
+    python benchmarks/bench_chunking.py --size-mb 20 --block-kb 1024
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import chunking
+import tokenization
+
+WORDS = ("grammar vocabulary learners practise the past tense every morning while teachers "
+         "explain phrasal verbs reported speech and conditional sentences with examples").split()
+
+
+def make_corpus(size_mb, seed=0):
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < size_mb << 20:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize()
+        sentence += rng.choice([". ", ". ", "? ", "! "])
+        if rng.random() < 0.08:
+            sentence += "\n\n"
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+
+def blocks(text, block_chars):
+    return [text[i:i + block_chars] for i in range(0, len(text), block_chars)]
+
+
+def spread(chunks):
+    counts = [len(offsets) for offsets in tokenization.token_offsets_batch(chunks)]
+    return f"tokens/chunk mean {statistics.mean(counts):.0f}, stdev {statistics.pstdev(counts):.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--block-kb", type=int, default=1024)
+    parser.add_argument("--tokens", type=int, default=chunking.CHUNK_TOKENS)
+    parser.add_argument("--overlap", type=int, default=chunking.CHUNK_OVERLAP)
+    args = parser.parse_args()
+
+    text = make_corpus(args.size_mb)
+    pieces = blocks(text, args.block_kb << 10)
+    mb = len(text.encode("utf-8")) / 1e6
+    print(f"{mb:.1f} MB in {len(pieces)} block(s); {args.tokens}-token chunks, {args.overlap}-token overlap")
+
+    start = time.perf_counter()
+    fixed = [text[i:i + 800] for i in range(0, len(text), 800)]
+    seconds = time.perf_counter() - start
+    print(f"{'fixed 800 chars':>18}: {mb / seconds:8.1f} MB/s  {len(fixed)} chunks")
+
+    start = time.perf_counter()
+    for piece in pieces:
+        tokenization.token_offsets_batch([piece])
+    tokenize_seconds = time.perf_counter() - start
+    print(f"{'tokenize only':>18}: {mb / tokenize_seconds:8.1f} MB/s")
+
+    start = time.perf_counter()
+    chunks, carry = [], ""
+    for piece in pieces:
+        [(done, carry)] = chunking.split_texts([carry + piece], args.tokens, args.overlap, final=False)
+        chunks.extend(done)
+    [(done, _)] = chunking.split_texts([carry], args.tokens, args.overlap)
+    chunks.extend(done)
+    seconds = time.perf_counter() - start
+    print(f"{'token-aware':>18}: {mb / seconds:8.1f} MB/s  {len(chunks)} chunks")
+
+    sample = random.Random(1).sample(range(len(fixed)), min(2000, len(fixed)))
+    print(f"{'fixed 800 chars':>18}: {spread([fixed[i] for i in sample])}")
+    sample = random.Random(1).sample(range(len(chunks)), min(2000, len(chunks)))
+    print(f"{'token-aware':>18}: {spread([chunks[i][0] for i in sample])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+core/benchmarks/bench_cold_start.py
+===================================
+Cold start of the API against a large vector store: time to import api.py,
+time for the first search (which triggers the lazy load) and RSS, with
+the FAISS index memory-mapped vs. read into RAM.
+
+Each measurement runs in a fresh interpreter. The index file will usually be
+in the OS page cache after it is written, which is also the steady state for
+a second uvicorn worker on the same host. RSS counts mapped pages once
+a flat scan touches them, but those pages are shared page cache rather than
+a private copy per worker.
+
+Run from the core folder:
+    python benchmarks/bench_cold_start.py --size-mb 1024 --dim 3072
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+CORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(CORE_DIR)
+
+import vector_store
+
+PROBE = """
+import time, json
+
+def rss_mb():
+    # Current RSS; ru_maxrss would report the benchmark parent's peak, inherited across fork.
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+
+start = time.perf_counter()
+import api
+import_seconds = time.perf_counter() - start
+
+import vector_store
+start = time.perf_counter()
+vector_store.search_similar([0.0] * vector_store_dim, top_k=3)
+first_search_seconds = time.perf_counter() - start
+
+print(json.dumps({
+    "import_api_ms": import_seconds * 1000,
+    "first_search_ms": first_search_seconds * 1000,
+    "load_ms": vector_store.load_stats()["load_seconds"] * 1000,
+    "memory_mapped": vector_store.load_stats()["memory_mapped"],
+    "rss_mb": rss_mb(),
+}))
+"""
+
+
+def build_store(workdir, size_mb, dim):
+    n = max(1, size_mb * 1024 * 1024 // (dim * 4))
+    os.chdir(workdir)
+    vector_store.clear_vector_store()
+    rng = np.random.default_rng(0)
+    batch = 10000
+    for start in range(0, n, batch):
+        rows = min(batch, n - start)
+        vector_store.add_document_embeddings(
+            rng.random((rows, dim), dtype=np.float32),
+            [{"id": f"bench-{start + i}", "source": "bench", "content": f"chunk {start + i}"} for i in range(rows)],
+        )
+    vector_store.save_vector_store()
+    return n
+
+
+def probe(workdir, dim, mmap):
+    env = dict(os.environ, PYTHONPATH=CORE_DIR, VECTOR_STORE_MMAP="1" if mmap else "0",
+               VECTOR_INDEX_TYPE="flat")
+    out = subprocess.run(
+        [sys.executable, "-c", f"vector_store_dim = {dim}\n" + PROBE],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--dim", type=int, default=3072)
+    args = parser.parse_args()
+
+    vector_store.INDEX_TYPE = "flat"  # keep the benchmark store a plain flat index
+    workdir = tempfile.mkdtemp(prefix="bench_cold_")
+    n = build_store(workdir, args.size_mb, args.dim)
+    print(f"store: {n} vectors x {args.dim} dims ({os.path.getsize(vector_store.VECTOR_STORE_INDEX_FILE) / 2**20:.0f} MB) in {workdir}")
+
+    print(f"{'mode':<8} {'import api ms':>14} {'first search ms':>16} {'load ms':>9} {'RSS MB':>8}")
+    for mmap in (False, True):
+        r = probe(workdir, args.dim, mmap)
+        label = "mmap" if r["memory_mapped"] else "in-RAM"
+        print(f"{label:<8} {r['import_api_ms']:>14.1f} {r['first_search_ms']:>16.1f} {r['load_ms']:>9.1f} {r['rss_mb']:>8.0f}")
+
+    vector_store.clear_vector_store()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+core/benchmarks/bench_http_pooling.py
+=====================================
+Per-request latency of Gemini-style calls with and without connection
+pooling, against a local stub server (no API key or network needed).
+
+"bare" is the old pattern - a fresh `requests.post` per call, so a new TCP
+connection every time; "pooled" goes through gemini_client's shared
+keep-alive session. The stub speaks plain HTTP, so this understates the gap
+seen against the real HTTPS endpoint, where each new connection also pays a
+TLS handshake. --rtt-ms adds a simulated network round trip per connection.
+
+Run from the core folder:
+    python benchmarks/bench_http_pooling.py --requests 500 --rtt-ms 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import gemini_client
+
+RESPONSE = json.dumps({"candidates": [{"content": {"parts": [{"text": "stub"}]}}]}).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # else Nagle + delayed ACK add ~40 ms per reused connection
+    rtt_seconds = 0.0
+
+    def setup(self):
+        super().setup()
+        # Charge one simulated round trip per new connection (the handshake).
+        time.sleep(self.rtt_seconds)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label, call, url, payload, n):
+    latencies = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        response = call(url, payload)
+        latencies[i] = time.perf_counter() - start
+        assert response.status_code == 200
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{label:<8} {latencies.mean() * 1000:>9.2f} {p50:>9.2f} {p99:>9.2f} {n / latencies.sum():>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    StubHandler.rtt_seconds = args.rtt_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1beta/models/stub:generateContent"
+    payload = {"contents": [{"parts": [{"text": "What is the capital of France?"}]}]}
+
+    def bare(url, payload):
+        return requests.post(url, headers={"Content-Type": "application/json"}, json=payload)
+
+    print(f"{args.requests} sequential requests, simulated connect RTT {args.rtt_ms} ms")
+    print(f"{'client':<8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>10}")
+    run("bare", bare, url, payload, args.requests)
+    run("pooled", gemini_client.post, url, payload, args.requests)
+    print("gemini_client.latency_stats():", gemini_client.latency_stats())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+core/benchmarks/bench_metadata_memory.py
+========================================
+Resident memory of chunk metadata at 100k chunks: the legacy JSON list
+(loaded wholesale) vs. the SQLite metadata store (only top_k rows fetched
+per search).
+
+Each mode runs in a fresh interpreter and reports the RSS growth over a bare
+interpreter (read from /proc, so Linux only) plus the time per top-3 fetch.
+
+Run from the core folder:
+    python benchmarks/bench_metadata_memory.py --chunks 100000 --chunk-chars 800
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+CORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(CORE_DIR)
+
+import metadata_store
+
+PROBE = """
+import sys, json, time, random
+
+def rss_kb():
+    # Current RSS; ru_maxrss would report the benchmark parent's peak, inherited across fork.
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+baseline = rss_kb()
+mode, json_path, db_path, n = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+random.seed(0)
+queries = [random.sample(range(n), 3) for _ in range(1000)]
+
+start = time.perf_counter()
+if mode == "json":
+    with open(json_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    for ids in queries:
+        rows = [metadata[i] for i in ids]
+else:
+    import metadata_store
+    metadata_store.open_store(db_path)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    for ids in queries:
+        rows = metadata_store.get_many(ids)
+fetch = (time.perf_counter() - start) / len(queries)
+
+print(json.dumps({
+    "rss_mb": (rss_kb() - baseline) / 1024,
+    "load_ms": load * 1000,
+    "fetch_us": fetch * 1e6,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--chunk-chars", type=int, default=800)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_meta_")
+    json_path = os.path.join(workdir, "vector_store_meta.json")
+    db_path = os.path.join(workdir, "vector_store_meta.db")
+
+    rng = np.random.default_rng(0)
+    alphabet = np.array(list("abcdefghijklmnopqrstuvwxyz     "))
+    items = [
+        {"id": f"bench.pdf-{i}", "source": "bench.pdf",
+         "content": "".join(rng.choice(alphabet, args.chunk_chars))}
+        for i in range(args.chunks)
+    ]
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(items, f)
+    del items
+    metadata_store.migrate_from_json(json_path, db_path)
+    print(f"{args.chunks} chunks x {args.chunk_chars} chars: JSON {os.path.getsize(json_path) / 2**20:.0f} MB, "
+          f"SQLite {os.path.getsize(db_path) / 2**20:.0f} MB")
+
+    print(f"{'backend':<8} {'RSS growth MB':>14} {'open/load ms':>13} {'top-3 fetch us':>15}")
+    env = dict(os.environ, PYTHONPATH=CORE_DIR)
+    for mode in ("json", "sqlite"):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, mode, json_path, db_path, str(args.chunks)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{mode:<8} {r['rss_mb']:>14.1f} {r['load_ms']:>13.1f} {r['fetch_us']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+core/benchmarks/bench_pdf_extraction.py
+=======================================
+PDF text extraction throughput (pages/sec) of ingestion.extract_pdf_pages
+with 1, 2, 4 and 8 worker processes, against a single in-process
+pdfplumber pass as the baseline.
+
+The PDF is generated: each page holds --lines lines of plain Helvetica
+text, roughly the density of a page of lecture notes. Scaling tops out at
+the number of cores on the machine.
+
+Run from the core folder:
+    python benchmarks/bench_pdf_extraction.py --pages 500 --processes 1 2 4 8
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pdfplumber
+
+import ingestion
+
+WORDS = "the quick brown fox jumps over a lazy dog while students revise grammar notes".split()
+
+
+def write_pdf(path, pages, lines):
+    """Writes a minimal text-only PDF with `pages` pages."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        rows = []
+        for line in range(lines):
+            words = [WORDS[(p * 7 + line * 3 + w) % len(WORDS)] for w in range(12)]
+            rows.append(f"({' '.join(words)} {p}-{line}) Tj T*")
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(rows) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def run_inline(path):
+    start = time.perf_counter()
+    with pdfplumber.open(path) as pdf:
+        pages = [page.extract_text() or "" for page in pdf.pages]
+    return len(pages), time.perf_counter() - start
+
+
+async def run_pool(path, processes):
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        # Warm the workers so process start-up is not counted.
+        list(pool.map(abs, range(processes)))
+        start = time.perf_counter()
+        count = 0
+        async for _page, _text in ingestion.extract_pdf_pages(path, pool=pool):
+            count += 1
+        return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pages-per-task", type=int, default=ingestion.PAGES_PER_TASK)
+    args = parser.parse_args()
+    ingestion.PAGES_PER_TASK = args.pages_per_task
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        write_pdf(path, args.pages, args.lines)
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPU(s), "
+              f"{ingestion.PAGES_PER_TASK} pages per task")
+
+        count, seconds = run_inline(path)
+        print(f"{'inline':>12}: {count / seconds:8.1f} pages/sec ({seconds:.2f}s)")
+        for processes in args.processes:
+            count, seconds = asyncio.run(run_pool(path, processes))
+            assert count == args.pages, count
+            print(f"{processes:>2} processes: {count / seconds:8.1f} pages/sec ({seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
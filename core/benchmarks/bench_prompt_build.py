@@ -0,0 +1,97 @@
+"""
+core/benchmarks/bench_prompt_build.py
+=====================================
+Prompt build time at 10, 100 and 1000 history turns: the previous per-mode
+builders (history concatenated with += in a loop) vs. the template registry
+in dynamic_prompting.py, rendering a history cold, rebuilding after one new
+turn in the same session (incremental), and with the default token budget
+applied on top (token counts cached per turn).
+
+Turns are generated chat of about --words-per-turn words.
+
+Run from the core folder:
+    python benchmarks/bench_prompt_build.py --turns 10 100 1000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import dynamic_prompting
+
+WORDS = ("learners practise the past tense phrasal verbs reported speech conditional "
+         "sentences vocabulary grammar examples explain why which when").split()
+CONTEXT = "[Source: notes.txt]\nReported speech shifts tenses back one step.\n"
+
+
+def previous_summary_prompt(user_query, conversation_history, retrieved_context):
+    """The summary builder as it was before the registry, for comparison."""
+    prompt_parts = [dynamic_prompting.TEMPLATES["summary"]["head"]]
+    if conversation_history:
+        history_str = ""
+        for turn in conversation_history:
+            history_str += f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
+        prompt_parts.append(f"Conversation History:\n{history_str.strip()}")
+    if retrieved_context:
+        prompt_parts.append(f"Document Content:\n{retrieved_context}")
+    prompt_parts.append(f"User: {user_query}")
+    return "\n\n".join(prompt_parts)
+
+
+def make_turns(n, words, rng):
+    def text(k):
+        return " ".join(rng.choice(WORDS) for _ in range(k)).capitalize() + "."
+    return [{"user": text(words // 4), "assistant": text(words)} for _ in range(n)]
+
+
+def per_call_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--words-per-turn", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'turns':>6} {'previous':>10} {'cold':>10} {'+1 turn':>10} {'budgeted':>10}   (ms per build)")
+    for n in args.turns:
+        turns = make_turns(n + args.repeat, args.words_per_turn, rng)
+        history = turns[:n]
+
+        previous = per_call_ms(lambda: previous_summary_prompt("Explain it.", history, CONTEXT), args.repeat)
+
+        def cold():
+            dynamic_prompting._history_cache.clear()
+            dynamic_prompting.build_dynamic_prompt("Explain it.", history, CONTEXT, token_budget=0)
+        cold_ms = per_call_ms(cold, args.repeat)
+
+        session = list(history)
+        dynamic_prompting.build_dynamic_prompt("Explain it.", session, CONTEXT, token_budget=0)
+        extra = iter(turns[n:])
+
+        def next_turn():
+            session.append(next(extra))
+            dynamic_prompting.build_dynamic_prompt("Explain it.", session, CONTEXT, token_budget=0)
+        incremental = per_call_ms(next_turn, args.repeat)
+
+        dynamic_prompting.build_dynamic_prompt("Explain it.", history, CONTEXT)  # warm the token counts
+        budgeted = per_call_ms(lambda: dynamic_prompting.build_dynamic_prompt("Explain it.", history, CONTEXT),
+                               args.repeat)
+
+        assert previous_summary_prompt("Explain it.", history, CONTEXT) == \
+            dynamic_prompting.build_dynamic_prompt("Explain it.", history, CONTEXT, token_budget=0)
+        print(f"{n:>6} {previous:>10.3f} {cold_ms:>10.3f} {incremental:>10.3f} {budgeted:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
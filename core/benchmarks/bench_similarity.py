@@ -0,0 +1,85 @@
+"""
+core/benchmarks/bench_similarity.py
+===================================
+Ranking one query against N candidate embeddings: the pairwise
+similarity.py functions in a Python loop vs. the vectorized *_batch
+functions, plus a many-vs-many *_matrix run and top-k selection with
+argpartition vs. a full argsort. Checks that the batch scores and top-k
+indices match the loop before timing.
+
+Vectors are random float32 of Gemini's embedding size.
+
+Run from the core folder:
+    python benchmarks/bench_similarity.py --n 10000 --dim 3072 --queries 32 --k 10
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import similarity
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((args.n, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    query = queries[0]
+    print(f"{args.n} x {args.dim} float32 candidates ({matrix.nbytes / 1e6:.0f} MB), {args.queries} queries, k={args.k}")
+
+    cases = [
+        ("cosine", similarity.cosine_similarity, lambda: similarity.cosine_similarity_batch(query, matrix)),
+        ("l2", similarity.l2_distance, lambda: similarity.l2_distance_batch(query, matrix)),
+        ("dot", similarity.dot_product_similarity, lambda: similarity.dot_product_batch(query, matrix)),
+    ]
+    for name, pairwise, batch in cases:
+        loop_seconds, expected = timed(lambda: np.array([pairwise(query, row) for row in matrix]), 1)
+        batch_seconds, scores = timed(batch, args.repeat)
+        largest = name != "l2"
+        same_top = np.array_equal(similarity.top_k(expected, args.k, largest)[0],
+                                  similarity.top_k(scores, args.k, largest)[0])
+        rel = np.max(np.abs(scores - expected)) / np.max(np.abs(expected))
+        print(f"{name:>7}: loop {loop_seconds * 1e3:8.1f} ms  batch {batch_seconds * 1e3:7.2f} ms  "
+              f"x{loop_seconds / batch_seconds:6.0f}  max rel err {rel:.1e}  same top-{args.k}: {same_top}")
+
+    unit = similarity.normalize_rows(matrix)
+    seconds, _ = timed(lambda: similarity.cosine_similarity_batch(query, unit, normalized=True), args.repeat)
+    print(f"{'cosine, pre-normalized':>24}: {seconds * 1e3:7.2f} ms")
+
+    seconds, scores = timed(lambda: similarity.cosine_similarity_matrix(queries, matrix), args.repeat)
+    print(f"{f'cosine matrix ({args.queries} queries)':>24}: {seconds * 1e3:7.2f} ms, "
+          f"{seconds * 1e3 / args.queries:.2f} ms/query")
+
+    row = scores[0]
+    full_seconds, _ = timed(lambda: np.argsort(-row)[:args.k], args.repeat * 10)
+    part_seconds, _ = timed(lambda: similarity.top_k(row, args.k), args.repeat * 10)
+    print(f"{'top-k over one row':>24}: argsort {full_seconds * 1e3:.3f} ms  argpartition {part_seconds * 1e3:.3f} ms")
+    full_seconds, _ = timed(lambda: np.argsort(-scores, axis=1)[:, :args.k], args.repeat)
+    part_seconds, _ = timed(lambda: similarity.top_k(scores, args.k), args.repeat)
+    print(f"{'top-k over all rows':>24}: argsort {full_seconds * 1e3:.3f} ms  argpartition {part_seconds * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+core/benchmarks/bench_startup.py
+================================
+API cold start: import time of every module `api` imports directly (from
+python -X importtime, best of --runs fresh interpreters), then a real
+uvicorn start timing how long until the server answers /ready at all
+("accepting") and until /ready returns 200 ("index loaded").
+
+The server runs in --store-dir (a temp dir with an empty store by
+default; point it at a directory holding vector_store.index to time a real
+index load).
+
+Run from the core folder:
+    python benchmarks/bench_startup.py --runs 3
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+
+CORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def import_times():
+    """{module: cumulative microseconds} for api and its direct imports, from one fresh interpreter."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import api"], cwd=CORE_DIR,
+                            capture_output=True, text=True, check=True).stderr
+    rows = [line.split("|") for line in stderr.splitlines() if line.startswith("import time:")][1:]
+    times, children = {}, {}
+    for _, cumulative, name in rows:
+        depth = (len(name) - len(name.lstrip())) // 2
+        children.setdefault(depth, []).append((name.strip(), int(cumulative)))
+        if depth == 0:
+            if name.strip() == "api":
+                times = dict(children.get(1, []))
+                times["api (total)"] = int(cumulative)
+            children = {}
+    return times
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_server(store_dir, timeout):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/ready"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--app-dir", CORE_DIR, "api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=store_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    accepting = ready = None
+    try:
+        while time.perf_counter() - start < timeout and ready is None:
+            try:
+                with urllib.request.urlopen(url, timeout=1):
+                    ready = time.perf_counter() - start
+            except urllib.error.HTTPError:
+                pass  # 503: up, index still loading
+            except OSError:
+                time.sleep(0.01)
+                continue
+            if accepting is None:
+                accepting = time.perf_counter() - start
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return accepting or ready, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--store-dir", default=None)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    best = {}
+    for _ in range(args.runs):
+        for module, micros in import_times().items():
+            best[module] = min(best.get(module, micros), micros)
+    print("import time (cumulative, best of runs):")
+    for module, micros in sorted(best.items(), key=lambda item: -item[1]):
+        print(f"  {module:<24} {micros / 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        accepting, ready = [], []
+        for _ in range(args.runs):
+            a, r = time_server(args.store_dir or tmp, args.timeout)
+            accepting.append(a)
+            ready.append(r)
+    print(f"uvicorn accepting (/ready answers): {min(a for a in accepting if a) * 1000:8.0f} ms")
+    loaded = [r for r in ready if r]
+    print(f"index loaded (/ready 200):          "
+          + (f"{min(loaded) * 1000:8.0f} ms" if loaded else "not within the timeout"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+core/benchmarks/bench_streaming_ingest.py
+=========================================
+Peak memory of ingesting a large TXT upload: the old buffered path (whole
+file read, decoded and chunked into one list before embedding) vs. the
+streaming background-job path (spool, incremental decode, lazy chunks).
+
+Each mode runs in a fresh interpreter against an empty vector store in a
+temp directory, with embeddings stubbed by small random vectors so only
+ingestion memory is measured (the FAISS index itself still grows by
+n_chunks * dim * 4 bytes). Reports peak RSS growth over the post-import
+baseline and exits with status 1 if the streaming path exceeds
+--ceiling-mb, so it can be used as a regression check.
+
+Run from the core folder:
+    python benchmarks/bench_streaming_ingest.py --size-mb 300 --ceiling-mb 96
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+CORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = """
+import sys, time, json, asyncio
+import numpy as np
+sys.path.append(CORE_DIR)
+
+def rss_mb(field):
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field + ":")) / 1024
+
+import embeddings, vector_store, ingestion, jobs, chunking
+
+async def fake_embeddings(texts, batch_size=None):
+    return np.random.rand(len(texts), DIM).astype(np.float32)
+
+embeddings.generate_embeddings_async = fake_embeddings
+vector_store.load_vector_store()
+# The tokenizer and faiss load lazily; pull them in so the baseline covers them.
+chunking.chunk_text("warm up")
+vector_store.faiss.IndexFlatL2(DIM)
+baseline = rss_mb("VmRSS")
+start = time.perf_counter()
+
+async def buffered():
+    with open(PATH, "rb") as f:
+        content = f.read()
+    text = content.decode("utf-8", errors="ignore")
+    chunks = chunking.chunk_text(text)
+    for i in range(0, len(chunks), ingestion.EMBED_BATCH_SIZE):
+        batch = [ingestion.chunk_metadata("big.txt", i + j, piece) for j, piece in enumerate(chunks[i:i + ingestion.EMBED_BATCH_SIZE])]
+        vectors = await embeddings.generate_embeddings_async([m["content"] for m in batch])
+        await asyncio.to_thread(vector_store.add_document_embeddings, vectors, batch)
+    return len(chunks)
+
+async def streaming():
+    with open(PATH, "rb") as f:
+        job_id = jobs.submit("big.txt", f)
+    await jobs._run(job_id)
+    return jobs.get_job(job_id)["chunks_processed"]
+
+chunks = asyncio.run(buffered() if MODE == "buffered" else streaming())
+print(json.dumps({
+    "chunks": chunks,
+    "seconds": time.perf_counter() - start,
+    "baseline_mb": baseline,
+    "peak_growth_mb": rss_mb("VmHWM") - baseline,
+}))
+"""
+
+
+def write_txt(path, size_mb):
+    line = "Students practise irregular verbs, phrasal verbs and reported speech every week. \n"
+    block = line * ((1 << 20) // len(line) + 1)
+    remaining = size_mb << 20
+    with open(path, "w", encoding="utf-8") as f:
+        while remaining > 0:
+            piece = block[:remaining]
+            f.write(piece)
+            remaining -= len(piece)
+
+
+def run(mode, path, dim, workdir):
+    # The file repeats one line, so content dedup would skip nearly every chunk.
+    env = dict(os.environ, VECTOR_INDEX_TYPE="flat", EMBEDDING_CACHE="0", VECTOR_STORE_DEDUP="0")
+    code = f"CORE_DIR = {CORE_DIR!r}; PATH = {path!r}; MODE = {mode!r}; DIM = {dim}\n" + PROBE
+    os.makedirs(workdir)
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=300)
+    parser.add_argument("--dim", type=int, default=4)
+    parser.add_argument("--ceiling-mb", type=float, default=96)
+    parser.add_argument("--modes", nargs="+", default=["buffered", "streaming"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.txt")
+        write_txt(path, args.size_mb)
+        print(f"{args.size_mb} MB TXT, dim={args.dim}")
+
+        results = {}
+        for mode in args.modes:
+            results[mode] = result = run(mode, path, args.dim, os.path.join(tmp, mode))
+            print(f"{mode:>10}: {result['chunks']} chunks in {result['seconds']:.1f}s, "
+                  f"peak RSS +{result['peak_growth_mb']:.0f} MB over {result['baseline_mb']:.0f} MB baseline")
+
+    if "streaming" in results and results["streaming"]["peak_growth_mb"] > args.ceiling_mb:
+        sys.exit(f"streaming ingest exceeded the {args.ceiling_mb:.0f} MB ceiling")
+
+
+if __name__ == "__main__":
+    main()
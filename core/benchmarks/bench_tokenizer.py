@@ -0,0 +1,82 @@
+"""
+core/benchmarks/bench_tokenizer.py
+==================================
+Cost of tokenization.py: import time in a fresh interpreter (the tokenizer
+now loads on first use) against import plus the first count (what every
+importer used to pay at import), then counting --texts strings one call at
+a time vs. one count_tokens_batch call, uncached and from the count cache.
+
+Run from the core folder:
+    python benchmarks/bench_tokenizer.py --texts 2000 --runs 3
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+
+CORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(CORE_DIR)
+
+import tokenization
+
+PROBE = """
+import sys, time
+sys.path.append({core!r})
+start = time.perf_counter()
+import tokenization
+imported = time.perf_counter()
+tokenization.count_tokens("warm up")
+print(imported - start, time.perf_counter() - start)
+"""
+
+WORDS = "learners practise grammar vocabulary phrasal verbs reported speech every week".split()
+
+
+def import_times(runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(core=CORE_DIR)],
+                             capture_output=True, text=True, check=True).stdout
+        results.append([float(x) for x in out.split()[-2:]])
+    return min(r[0] for r in results), min(r[1] for r in results)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    import_s, first_count_s = import_times(args.runs)
+    print(f"import tokenization:        {import_s * 1000:8.1f} ms")
+    print(f"import + first count_tokens: {first_count_s * 1000:7.1f} ms  (previously all paid at import)")
+
+    rng = random.Random(0)
+    texts = [" ".join(rng.choice(WORDS) for _ in range(args.words)) + f" #{i}" for i in range(args.texts)]
+    tokenization.count_tokens("warm up")
+
+    tokenization._counts.clear()
+    single = timed(lambda: [tokenization.count_tokens(text) for text in texts])
+    expected = [len(tokenization.get_tokenizer().encode(text)) for text in texts]
+    tokenization._counts.clear()
+    batch = timed(lambda: tokenization.count_tokens_batch(texts))
+    assert tokenization.count_tokens_batch(texts) == expected
+    cached = timed(lambda: tokenization.count_tokens_batch(texts))
+    print(f"{args.texts} texts of ~{args.words} words:")
+    print(f"  count_tokens one by one:   {single * 1000:8.1f} ms")
+    print(f"  count_tokens_batch:        {batch * 1000:8.1f} ms  x{single / batch:.1f}")
+    print(f"  count_tokens_batch cached: {cached * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+core/benchmarks/bench_vector_store_add.py
+=========================================
+Ingestion throughput of the vector store: per-chunk adds vs. one bulk add.
+
+"before" replays the old upload loop (one add_document_embedding call per
+chunk with a full snapshot rewrite each time); "after" stacks the batch and
+calls add_document_embeddings once. Embedding calls are not included -
+random float32 vectors stand in for Gemini output.
+
+Run from the core folder:
+    python benchmarks/bench_vector_store_add.py --dim 3072 --sizes 1000 10000 100000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import vector_store
+
+
+def run_per_chunk(vectors, persistence):
+    vector_store.PERSISTENCE_MODE = persistence
+    vector_store.clear_vector_store()
+    start = time.perf_counter()
+    for i, vec in enumerate(vectors):
+        vector_store.add_document_embedding(vec, {"id": f"bench-{i}", "source": "bench", "content": f"chunk {i}"})
+    return time.perf_counter() - start
+
+
+def run_bulk(vectors, persistence):
+    vector_store.PERSISTENCE_MODE = persistence
+    vector_store.clear_vector_store()
+    metas = [{"id": f"bench-{i}", "source": "bench", "content": f"chunk {i}"} for i in range(len(vectors))]
+    start = time.perf_counter()
+    vector_store.add_document_embeddings(vectors, metas)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--max-before", type=int, default=10000,
+                        help="skip the quadratic per-chunk snapshot run above this many chunks")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix="bench_vs_")
+    os.chdir(workdir)
+    print(f"dim={args.dim}  workdir={workdir}")
+    print(f"{'chunks':>8}  {'before (chunks/s)':>18}  {'per-chunk WAL':>14}  {'bulk (chunks/s)':>16}")
+
+    for n in args.sizes:
+        vectors = rng.random((n, args.dim), dtype=np.float32)
+
+        if n <= args.max_before:
+            before = f"{n / run_per_chunk(vectors, 'snapshot'):,.0f}"
+        else:
+            before = "skipped"
+        per_chunk_wal = n / run_per_chunk(vectors, "wal")
+        bulk = n / run_bulk(vectors, "wal")
+        print(f"{n:>8}  {before:>18}  {per_chunk_wal:>14,.0f}  {bulk:>16,.0f}")
+
+    vector_store.clear_vector_store()
+
+
+if __name__ == "__main__":
+    main()
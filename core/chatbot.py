@@ -2,7 +2,8 @@
 core/chatbot.py
 ================
 NextGenLingo AI Assistant with:
-- Persistent Multi-turn Contextual Memory
+- Persistent Multi-turn Contextual Memory (append-only log, recent window
+  plus a rolling summary of older turns)
 - Dynamic Prompting
 - Chain-of-Thought Prompting (prefix: cot:)
 - Ready for RAG integration (retrieved context placeholder)
@@ -12,33 +13,128 @@ import os
 import re
 import sys
 import json
-from dotenv import load_dotenv
 
 # Ensure project root is in sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from core import settings  # loads .env before the settings below are read
 from core import prompting, function_calling, dynamic_prompting, chain_of_thought
 # RAG Engine will be integrated later
 # from core import rag_engine
 
-load_dotenv()
-
-MEMORY_FILE = "conversation_memory.json"
+# Memory is an append-only JSONL log: one {"type": "turn"} record per turn, and
+# a {"type": "summary"} record whenever older turns are folded into the
+# running summary. Only the last MEMORY_WINDOW turns are kept verbatim; once
+# the window overflows, the oldest SUMMARIZE_BATCH of them are summarized.
+MEMORY_FILE = "conversation_memory.jsonl"
+LEGACY_MEMORY_FILE = "conversation_memory.json"  # pretty-printed list; migrated on first start
+MEMORY_WINDOW = int(os.getenv("CHAT_MEMORY_WINDOW", "20"))
+SUMMARIZE_BATCH = int(os.getenv("CHAT_SUMMARIZE_BATCH", "10"))
+_TAIL_BLOCK = 64 * 1024
 
 # -----------------------
 # Persistent Memory Helpers
 # -----------------------
-def load_conversation_history():
-    if os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+def _append_records(records):
+    """Appends records to the memory log; one small write per turn, however long the chat."""
+    with open(MEMORY_FILE, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+def _lines_from_end(path):
+    """Yields the lines of a file newest first, reading it backwards in blocks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b""
+        while position > 0:
+            size = min(_TAIL_BLOCK, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + tail).split(b"\n")
+            tail = lines.pop(0)  # may be cut mid-line; completed by the next block
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+def _migrate_legacy_memory():
+    with open(LEGACY_MEMORY_FILE, "r", encoding="utf-8") as f:
+        turns = json.load(f)
+    _append_records({"type": "turn", **turn} for turn in turns)
+    os.replace(LEGACY_MEMORY_FILE, LEGACY_MEMORY_FILE + ".migrated")
+    print(f"Migrated {len(turns)} turns from {LEGACY_MEMORY_FILE} to {MEMORY_FILE}.")
 
-def save_conversation_history(history):
-    with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2)
+def load_conversation_history():
+    """
+    Returns (summary, recent turns) from the tail of the memory log: the
+    latest summary record and the turns not folded into it (at most
+    MEMORY_WINDOW of them). Older records are never read.
+    """
+    if not os.path.exists(MEMORY_FILE) and os.path.exists(LEGACY_MEMORY_FILE):
+        _migrate_legacy_memory()
+    if not os.path.exists(MEMORY_FILE):
+        return None, []
+
+    summary, turns, wanted = None, [], MEMORY_WINDOW
+    for line in _lines_from_end(MEMORY_FILE):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # torn last line from a crash mid-write
+        if record.get("type") == "summary":
+            if summary is None:
+                # Turns still in the window when it was written precede it in the log.
+                summary = record["text"]
+                wanted = min(MEMORY_WINDOW, len(turns) + record.get("kept", 0))
+            continue
+        if len(turns) >= wanted:
+            if summary is not None:
+                break
+            continue  # more unsummarized turns than the window; keep looking for a summary
+        turns.append({"user": record["user"], "assistant": record["assistant"]})
+    turns.reverse()
+    return summary, turns
+
+def summarize_turns(summary, turns):
+    """Folds turns into the running summary with one Gemini call."""
+    transcript = "\n".join(f"User: {turn['user']}\nAssistant: {turn['assistant']}" for turn in turns)
+    return prompting.system_user_prompt(
+        "You maintain the running memory of a conversation. Merge the existing summary and the new "
+        "turns into one concise summary that keeps names, facts, decisions and open questions. "
+        "Reply with the summary only.",
+        f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}",
+        generation_config={"temperature": 0},
+    )
 
-conversation_history = load_conversation_history()
+def save_conversation_history(user_input, assistant_reply):
+    """Records a turn: appends it to the log and summarizes the oldest turns once the window overflows."""
+    global conversation_summary
+    conversation_history.append({"user": user_input, "assistant": assistant_reply})
+    _append_records([{"type": "turn", "user": user_input, "assistant": assistant_reply}])
+
+    if len(conversation_history) > MEMORY_WINDOW:
+        folded = conversation_history[:SUMMARIZE_BATCH]
+        try:
+            conversation_summary = summarize_turns(conversation_summary, folded)
+        except Exception as e:
+            print(f"[Memory] Summarization failed, keeping the full window for now: {e}")
+            return
+        del conversation_history[:SUMMARIZE_BATCH]
+        _append_records([{"type": "summary", "text": conversation_summary, "kept": len(conversation_history)}])
+
+_summary_turn = None  # reused while the summary is unchanged, so render_history can extend its cached text
+
+def prompt_history():
+    """The remembered conversation as prompt turns: the summary first, then the recent turns."""
+    global _summary_turn
+    if not conversation_summary:
+        return list(conversation_history)
+    if _summary_turn is None or _summary_turn["assistant"] != conversation_summary:
+        _summary_turn = {"user": "(Summary of our earlier conversation)", "assistant": conversation_summary}
+    return [_summary_turn] + conversation_history
+
+conversation_summary, conversation_history = load_conversation_history()
 
 # -----------------------
 # Intent Detection
@@ -83,8 +179,7 @@ def run_chatbot():
             print(f"[Intent] Detected action: {intent}")
             result = function_calling.execute_action(intent, params)
             print("Assistant:", result)
-            conversation_history.append({"user": user_input, "assistant": result})
-            save_conversation_history(conversation_history)
+            save_conversation_history(user_input, result)
             continue
 
         # 2. Chain-of-Thought mode
@@ -96,8 +191,7 @@ def run_chatbot():
                 show_reasoning = True
             ai_response = chain_of_thought.chain_of_thought_prompt(cot_query, show_reasoning)
             print("Assistant:", ai_response)
-            conversation_history.append({"user": user_input, "assistant": ai_response})
-            save_conversation_history(conversation_history)
+            save_conversation_history(user_input, ai_response)
             continue
 
         # 3. RAG doc-query (placeholder until rag_engine.py done)
@@ -107,8 +201,7 @@ def run_chatbot():
             # ai_response = rag_engine.query_with_rag(doc_query)
             ai_response = "[RAG placeholder] Retrieved context answer will go here."
             print("Assistant:", ai_response)
-            conversation_history.append({"user": user_input, "assistant": ai_response})
-            save_conversation_history(conversation_history)
+            save_conversation_history(user_input, ai_response)
             continue
 
         # 4. Dynamic Prompting (default mode)
@@ -118,7 +211,7 @@ def run_chatbot():
 
         dynamic_prompt = dynamic_prompting.build_dynamic_prompt(
             user_query=user_input,
-            conversation_history=conversation_history,
+            conversation_history=prompt_history(),
             retrieved_context=retrieved_context,
             output_format=None  # Could be "Markdown" or "JSON"
         )
@@ -130,8 +223,7 @@ def run_chatbot():
         print("Assistant:", ai_response)
 
         # Save to persistent memory
-        conversation_history.append({"user": user_input, "assistant": ai_response})
-        save_conversation_history(conversation_history)
+        save_conversation_history(user_input, ai_response)
 
 # -----------------------
 if __name__ == "__main__":
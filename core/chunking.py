@@ -0,0 +1,131 @@
+"""
+core/chunking.py
+================
+Token-aware text chunking for NextGenLingo ingestion.
+
+Chunks target CHUNK_TOKENS tokens (counted with the fast tokenizer in
+tokenization.py), overlap the previous chunk by about CHUNK_OVERLAP tokens
+and end on a paragraph break where possible, else on a sentence end, else
+between words, so words and sentences are not cut in half. A paragraph or
+sentence boundary is only used if the chunk keeps at least MIN_FILL of its
+target size.
+
+Texts are tokenized in one batched call with character offsets, so
+snapping and slicing are done on the original string with no decoding.
+"""
+
+import os
+import re
+from bisect import bisect_left, bisect_right
+
+import tokenization
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+MIN_FILL = float(os.getenv("CHUNK_MIN_FILL", "0.5"))
+
+_PARAGRAPH_END = re.compile(r"\n[ \t]*\n")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+
+
+def _boundary_tokens(pattern, text, starts):
+    """Token indices at which a match of `pattern` ends (the first token after it)."""
+    return [bisect_left(starts, match.end()) for match in pattern.finditer(text)]
+
+
+def _word_start(text, starts, k, lo, hi, step):
+    """Nearest token index to k (stepping by step within lo..hi) whose token begins a word, or None."""
+    while lo <= k <= hi:
+        pos = starts[k]
+        if pos == 0 or text[pos].isspace() or text[pos - 1].isspace():
+            return k
+        k += step
+    return None
+
+
+def _split(text, offsets, max_tokens, overlap, final):
+    """
+    Chunks one tokenized text. Returns ([(chunk text, token count)], carry)
+    where carry is the text from the start of the first chunk not emitted
+    (only when final is False; the caller prepends it to the next piece).
+    """
+    n = len(offsets)
+    if n == 0:
+        return [], ""
+    starts = [start for start, _ in offsets]
+    paragraphs = _boundary_tokens(_PARAGRAPH_END, text, starts)
+    sentences = _boundary_tokens(_SENTENCE_END, text, starts)
+    min_tokens = max(1, int(max_tokens * MIN_FILL))
+
+    chunks = []
+    i = 0
+    while i < n:
+        limit = i + max_tokens
+        if limit >= n:
+            if not final:
+                return chunks, text[starts[i]:]
+            end = n
+        else:
+            end = None
+            for boundaries in (paragraphs, sentences):
+                k = bisect_right(boundaries, limit) - 1
+                if k >= 0 and boundaries[k] >= i + min_tokens:
+                    end = boundaries[k]
+                    break
+            if end is None:
+                end = _word_start(text, starts, limit, i + min_tokens, limit, -1) or limit
+
+        piece = text[starts[i]:offsets[end - 1][1]].strip()
+        if piece:
+            chunks.append((piece, end - i))
+        if end == n:
+            break
+
+        # Start the next chunk `overlap` tokens back, moved forward to a sentence
+        # start if there is one in the overlap, else to a word start.
+        next_i = end
+        if overlap:
+            back = max(end - overlap, i + 1)
+            k = bisect_left(sentences, back)
+            if k < len(sentences) and sentences[k] < end:
+                next_i = sentences[k]
+            else:
+                next_i = _word_start(text, starts, back, back, end, 1) or end
+        i = next_i
+    return chunks, ""
+
+
+def split_texts(texts, max_tokens=None, overlap=None, final=True):
+    """
+    Chunks several texts with one batched tokenizer call. Returns a list of
+    (chunks, carry) per text, each chunk a (text, token count) pair. With
+    final=False the unfinished tail of each text is returned as carry
+    instead of being emitted, for callers that feed text in pieces.
+    """
+    max_tokens = max_tokens or CHUNK_TOKENS
+    overlap = CHUNK_OVERLAP if overlap is None else overlap
+    if overlap >= max_tokens:
+        raise ValueError("Chunk overlap must be smaller than the chunk size.")
+    texts = list(texts)
+    offsets = tokenization.token_offsets_batch(texts)
+    return [_split(text, spans, max_tokens, overlap, final) for text, spans in zip(texts, offsets)]
+
+
+def chunk_texts(texts, max_tokens=None, overlap=None):
+    """Chunks several texts in one batch; returns a list of chunk strings per text."""
+    return [[piece for piece, _ in chunks] for chunks, _ in split_texts(texts, max_tokens, overlap)]
+
+
+def chunk_text(text, max_tokens=None, overlap=None):
+    """Chunks one text; returns a list of chunk strings."""
+    return chunk_texts([text], max_tokens, overlap)[0]
+
+
+if __name__ == "__main__":
+    sample = (
+        "Python is a programming language. It is popular for data science.\n\n"
+        "HTML is a markup language! It describes the structure of web pages. "
+        "CSS styles those pages, and JavaScript makes them interactive."
+    )
+    for number, piece in enumerate(chunk_text(sample, max_tokens=16, overlap=4)):
+        print(f"[{number}] {piece!r}")
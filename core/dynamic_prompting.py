@@ -1,178 +1,327 @@
-import prompting
-
-def build_summary_prompt(user_query, conversation_history=None, retrieved_context=None, output_format=None):
-    system_instructions = (
-        "You are NextGenLingo, an advanced AI assistant. "
-        "Provide a concise summary of the provided document or content in maximum 2 lines. "
-        "Use the retrieved context fully to ground your summary."
-    )
-    
-    prompt_parts = [f"System: {system_instructions}"]
-
-    if conversation_history:
-        history_str = ""
-        for turn in conversation_history:
-            history_str += f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
-        prompt_parts.append(f"Conversation History:\n{history_str.strip()}")
-
-    if retrieved_context:
-        prompt_parts.append(f"Document Content:\n{retrieved_context}")
-
-    prompt_parts.append(f"User: {user_query}")
-
-    if output_format:
-        prompt_parts.append(f"Please respond in {output_format} format.")
-
-    return "\n\n".join(prompt_parts)
-
-# dynamic_prompting.py
 """
+core/dynamic_prompting.py
+=========================
 Dynamic prompt construction for NextGenLingo.
-Includes dedicated prompt templates for multiple chatbot modes.
-"""
-
-def build_summary_prompt(user_query, conversation_history=None, retrieved_context=None, output_format=None):
-    system_instructions = (
-        "You are NextGenLingo, an advanced AI assistant. "
-        "Provide a concise summary of the provided document or content in maximum 2 lines. "
-        "Use the retrieved context fully to ground your summary."
-    )
 
-    prompt_parts = [f"System: {system_instructions}"]
+Each chatbot mode is a template in a registry: its system text, the label
+of its context section and optional closing instructions are declared once
+with `register_template` and compiled into prompt fragments at import.
+`build_dynamic_prompt` looks the mode up (unknown modes fall back to
+"summary"), so a new mode only needs a `register_template` call.
 
-    if conversation_history:
-        history_str = ""
-        for turn in conversation_history:
-            history_str += f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
-        prompt_parts.append(f"Conversation History:\n{history_str.strip()}")
+History is rendered in one linear pass, and the rendered text of a session
+is cached: when the same history list grows by a turn, only the new turn
+is rendered. Prompts are trimmed to a token budget (see
+build_dynamic_prompt_with_report).
+"""
 
-    if retrieved_context:
-        prompt_parts.append(f"Document Content:\n{retrieved_context}")
+import os
+import re
+from collections import OrderedDict
 
-    prompt_parts.append(f"User: {user_query}")
+import tokenization
 
-    if output_format:
-        prompt_parts.append(f"Please respond in {output_format} format.")
+# mode -> compiled template, see register_template
+TEMPLATES = {}
+DEFAULT_MODE = "summary"
 
-    return "\n\n".join(prompt_parts)
 
+def register_template(mode, system, context_label="Document Content", instructions=None, output_format=False):
+    """
+    Adds (or replaces) the template for mode. The prompt is the system text,
+    the conversation history, the retrieved context under context_label, the
+    user query, then `instructions` if given. With output_format=True the
+    caller's output format is requested last.
+    """
+    TEMPLATES[mode] = {
+        "head": f"System: {system}",
+        "context_prefix": f"{context_label}:\n",
+        "tail": instructions,
+        "output_format": output_format,
+    }
+
+
+register_template(
+    "summary",
+    "You are NextGenLingo, an advanced AI assistant. "
+    "Provide a concise summary of the provided document or content in maximum 2 lines. "
+    "Use the retrieved context fully to ground your summary.",
+    output_format=True,
+)
+register_template(
+    "quiz",
+    "You are NextGenLingo. "
+    "Based on the provided document content, create 3 multiple-choice questions "
+    "with exactly 4 options each and indicate the correct option clearly as 'Correct: X' where X is A/B/C/D. "
+    "Each question must be in this format:\n"
+    "1. <question here>\n"
+    "A. <option A>\n"
+    "B. <option B>\n"
+    "C. <option C>\n"
+    "D. <option D>\n"
+    "Correct: <A/B/C/D>\n"
+    "Repeat for 3 questions and do NOT add explanations or other text.",
+)
+register_template(
+    "flashcards",
+    "You are NextGenLingo. Create concise flashcards (question and answer pairs) "
+    "based on the provided content to help a user memorize key concepts.",
+    instructions="Please format the answer as flashcard pairs.",
+)
+register_template(
+    "code_review",
+    "You are NextGenLingo, specializing in code analysis. "
+    "Review the provided code or technical content and provide clear explanations, "
+    "suggest improvements, and point out issues.",
+    context_label="Code or technical content",
+)
+register_template(
+    "debate",
+    "You are NextGenLingo. Engage in a debate format with the user on the provided topic. "
+    "Provide arguments supporting and opposing the topic based on the context.",
+    context_label="Debate topic context",
+)
+
+
+# Rendered history of recent sessions: id(first turn) -> (turns rendered, text).
+# The turns are held, so an id cannot be reused while its entry is cached.
+HISTORY_CACHE_SESSIONS = int(os.getenv("PROMPT_HISTORY_CACHE_SESSIONS", "64"))
+_history_cache = OrderedDict()
+
+
+def _format_turn(turn):
+    return f"User: {turn['user']}\nAssistant: {turn['assistant']}"
+
+
+def render_history(conversation_history):
+    """
+    The history section text. If this history list extends one rendered
+    before (same turn objects, more of them), only the new turns are rendered.
+    Turns are not expected to change once added.
+    """
+    turns = list(conversation_history)
+    key = id(turns[0])
+    cached = _history_cache.get(key)
+    if cached is not None and len(cached[0]) <= len(turns) and all(a is b for a, b in zip(cached[0], turns)):
+        done, text = cached
+        if len(done) < len(turns):
+            text += "\n" + "\n".join(_format_turn(turn) for turn in turns[len(done):])
+        _history_cache.move_to_end(key)
+    else:
+        text = "\n".join(_format_turn(turn) for turn in turns)
+    _history_cache[key] = (turns, text)
+    while len(_history_cache) > HISTORY_CACHE_SESSIONS:
+        _history_cache.popitem(last=False)
+    return text.strip()
 
-def build_quiz_prompt(user_query, conversation_history=None, retrieved_context=None):
-    system_instructions = (
-        "You are NextGenLingo. "
-        "Based on the provided document content, create 3 multiple-choice questions "
-        "with exactly 4 options each and indicate the correct option clearly as 'Correct: X' where X is A/B/C/D. "
-        "Each question must be in this format:\n"
-        "1. <question here>\n"
-        "A. <option A>\n"
-        "B. <option B>\n"
-        "C. <option C>\n"
-        "D. <option D>\n"
-        "Correct: <A/B/C/D>\n"
-        "Repeat for 3 questions and do NOT add explanations or other text."
-    )
-    
-    prompt_parts = [f"System: {system_instructions}"]
 
+def render_prompt(mode, user_query, conversation_history=None, retrieved_context=None, output_format=None):
+    """Fills the template for mode (DEFAULT_MODE if unknown) with no token budget."""
+    template = TEMPLATES.get(mode) or TEMPLATES[DEFAULT_MODE]
+    prompt_parts = [template["head"]]
     if conversation_history:
-        history_str = ""
-        for turn in conversation_history:
-            history_str += f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
-        prompt_parts.append(f"Conversation History:\n{history_str.strip()}")
-
+        prompt_parts.append(f"Conversation History:\n{render_history(conversation_history)}")
     if retrieved_context:
-        prompt_parts.append(f"Document Content:\n{retrieved_context}")
-
+        prompt_parts.append(template["context_prefix"] + retrieved_context)
     prompt_parts.append(f"User: {user_query}")
+    if template["tail"]:
+        prompt_parts.append(template["tail"])
+    if output_format and template["output_format"]:
+        prompt_parts.append(f"Please respond in {output_format} format.")
     return "\n\n".join(prompt_parts)
 
 
+def build_summary_prompt(user_query, conversation_history=None, retrieved_context=None, output_format=None):
+    return render_prompt("summary", user_query, conversation_history, retrieved_context, output_format)
 
-def build_flashcards_prompt(user_query, conversation_history=None, retrieved_context=None):
-    system_instructions = (
-        "You are NextGenLingo. Create concise flashcards (question and answer pairs) "
-        "based on the provided content to help a user memorize key concepts."
-    )
-
-    prompt_parts = [f"System: {system_instructions}"]
-
-    if conversation_history:
-        history_str = ""
-        for turn in conversation_history:
-            history_str += f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
-        prompt_parts.append(f"Conversation History:\n{history_str.strip()}")
 
-    if retrieved_context:
-        prompt_parts.append(f"Document Content:\n{retrieved_context}")
+def build_quiz_prompt(user_query, conversation_history=None, retrieved_context=None):
+    return render_prompt("quiz", user_query, conversation_history, retrieved_context)
 
-    prompt_parts.append(f"User: {user_query}")
-    prompt_parts.append("Please format the answer as flashcard pairs.")
 
-    return "\n\n".join(prompt_parts)
+def build_flashcards_prompt(user_query, conversation_history=None, retrieved_context=None):
+    return render_prompt("flashcards", user_query, conversation_history, retrieved_context)
 
 
 def build_code_review_prompt(user_query, conversation_history=None, retrieved_context=None):
-    system_instructions = (
-        "You are NextGenLingo, specializing in code analysis. "
-        "Review the provided code or technical content and provide clear explanations, "
-        "suggest improvements, and point out issues."
-    )
-
-    prompt_parts = [f"System: {system_instructions}"]
-
-    if conversation_history:
-        history_str = ""
-        for turn in conversation_history:
-            history_str += f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
-        prompt_parts.append(f"Conversation History:\n{history_str.strip()}")
-
-    if retrieved_context:
-        prompt_parts.append(f"Code or technical content:\n{retrieved_context}")
-
-    prompt_parts.append(f"User: {user_query}")
-
-    return "\n\n".join(prompt_parts)
+    return render_prompt("code_review", user_query, conversation_history, retrieved_context)
 
 
 def build_debate_prompt(user_query, conversation_history=None, retrieved_context=None):
-    system_instructions = (
-        "You are NextGenLingo. Engage in a debate format with the user on the provided topic. "
-        "Provide arguments supporting and opposing the topic based on the context."
-    )
-
-    prompt_parts = [f"System: {system_instructions}"]
-
-    if conversation_history:
-        history_str = ""
-        for turn in conversation_history:
-            history_str += f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
-        prompt_parts.append(f"Conversation History:\n{history_str.strip()}")
-
-    if retrieved_context:
-        prompt_parts.append(f"Debate topic context:\n{retrieved_context}")
-
-    prompt_parts.append(f"User: {user_query}")
-
-    return "\n\n".join(prompt_parts)
-
-
-
-def build_dynamic_prompt(user_query, conversation_history=None, retrieved_context=None, output_format=None, mode="summary"):
+    return render_prompt("debate", user_query, conversation_history, retrieved_context)
+
+
+# Token budget for the whole prompt; 0 = no limit. History gets at least
+# HISTORY_SHARE of what is left after the fixed parts when context competes for it.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000"))
+HISTORY_SHARE = float(os.getenv("PROMPT_HISTORY_SHARE", "0.3"))
+# A chunk is only truncated (at a sentence end) if at least this many tokens of it fit.
+MIN_TRUNCATED_TOKENS = int(os.getenv("PROMPT_MIN_TRUNCATED_TOKENS", "24"))
+# Allowance per section header and per separator, so estimates stay on the safe side.
+_SECTION_TOKENS = 8
+_JOIN_TOKENS = 4
+HISTORY_COUNT_BATCH = 16
+
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+
+
+def _count(text):
+    """Token count of a history turn, chunk or header; tokenization.py caches counts, so repeats cost nothing."""
+    return tokenization.count_tokens(text)
+
+
+def _chunk_header(result):
+    meta = result.get("metadata", {})
+    source_name = meta.get("source", "unknown source")
+    if meta.get("page"):
+        source_name += f", page {meta['page']}"
+    return f"[Source: {source_name}]\n"
+
+
+def format_chunk(result, content=None):
+    """A search result as a context block; `content` overrides the chunk text (for truncation)."""
+    if content is None:
+        content = result.get("metadata", {}).get("content", "")
+    return f"{_chunk_header(result)}{content}\n"
+
+
+def format_context(results):
+    """Search results (or pre-formatted blocks) joined into one context section."""
+    return "\n---\n".join(block if isinstance(block, str) else format_chunk(block) for block in results)
+
+
+def _chunk_tokens(result):
+    """Token count of a formatted chunk plus its separator."""
+    return _count(format_chunk(result)) + _JOIN_TOKENS
+
+
+def _truncate_at_sentence(text, max_tokens):
+    """Longest prefix of text ending at a sentence end within max_tokens tokens, or None."""
+    offsets = tokenization.token_offsets_batch([text])[0]
+    if max_tokens <= 0 or not offsets:
+        return None
+    if len(offsets) <= max_tokens:
+        return text
+    limit = offsets[max_tokens - 1][1]
+    cut = None
+    for match in _SENTENCE_END.finditer(text, 0, limit + 1):
+        cut = match.end()
+    if cut is None:
+        return None
+    return text[:cut].rstrip()
+
+
+def _as_results(retrieved_context):
+    """Retrieved context as a list of search-result dicts, highest score first."""
+    if not retrieved_context:
+        return []
+    if isinstance(retrieved_context, str):
+        return [{"metadata": {"source": None, "content": retrieved_context}, "raw": True}]
+    # Stable sort: results without scores keep their retrieval order.
+    return sorted(retrieved_context, key=lambda result: -result.get("score", 0.0))
+
+
+def _fit_history(history, allowance):
+    """Newest turns that fit in allowance tokens, in their original order; returns (turns, tokens)."""
+    kept, used = [], 0
+    # Newest first, counting HISTORY_COUNT_BATCH turns per tokenizer call; older turns are never counted.
+    for end in range(len(history), 0, -HISTORY_COUNT_BATCH):
+        turns = history[max(0, end - HISTORY_COUNT_BATCH):end][::-1]
+        for turn, tokens in zip(turns, tokenization.count_tokens_batch([_format_turn(turn) for turn in turns])):
+            if used + tokens + _JOIN_TOKENS > allowance:
+                kept.reverse()
+                return kept, used
+            kept.append(turn)
+            used += tokens + _JOIN_TOKENS
+    kept.reverse()
+    return kept, used
+
+
+def _fit_context(results, allowance, report):
+    """Highest-scoring chunks that fit in allowance tokens, the first that does not truncated; returns (blocks, tokens)."""
+    blocks, used = [], 0
+    for result in results:
+        raw = result.get("raw")
+        tokens = _count(result["metadata"]["content"]) + _JOIN_TOKENS if raw else _chunk_tokens(result)
+        if used + tokens <= allowance:
+            blocks.append(result["metadata"]["content"] if raw else result)
+            used += tokens
+            continue
+        overhead = _JOIN_TOKENS + (0 if raw else _count(_chunk_header(result)) + 1)
+        room = allowance - used - overhead
+        content = None
+        if room >= MIN_TRUNCATED_TOKENS:
+            content = _truncate_at_sentence(result["metadata"].get("content", ""), room)
+        if content:
+            blocks.append(content if raw else format_chunk(result, content))
+            used += overhead + _count(content)
+            report["chunks_truncated"] += 1
+        else:
+            report["chunks_dropped"] += 1
+            if not raw:
+                meta = result.get("metadata", {})
+                report["dropped_sources"].append(meta.get("id") or meta.get("source"))
+    return blocks, used
+
+
+def build_dynamic_prompt_with_report(user_query, conversation_history=None, retrieved_context=None,
+                                     output_format=None, mode="summary", token_budget=None):
     """
-    Master prompt builder selecting prompt template based on mode.
+    Builds the prompt for mode within token_budget tokens (default
+    PROMPT_TOKEN_BUDGET, 0 = no limit) and returns (prompt, report).
+
+    retrieved_context is either a context string or a list of search results
+    (vector_store.search_similar dicts). The instructions and query are always
+    kept. History keeps its newest turns and context its highest-scoring
+    chunks; the first chunk that does not fit is cut at a sentence end.
+    Token counts come from tokenization.py and are estimates.
     """
-    if mode == "summary":
-        return build_summary_prompt(user_query, conversation_history, retrieved_context, output_format)
-    elif mode == "quiz":
-        return build_quiz_prompt(user_query, conversation_history, retrieved_context)
-    elif mode == "flashcards":
-        return build_flashcards_prompt(user_query, conversation_history, retrieved_context)
-    elif mode == "code_review":
-        return build_code_review_prompt(user_query, conversation_history, retrieved_context)
-    elif mode == "debate":
-        return build_debate_prompt(user_query, conversation_history, retrieved_context)
-    else:
-        # default fallback
-        return build_summary_prompt(user_query, conversation_history, retrieved_context, output_format)
+    budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    history = list(conversation_history or [])
+    results = _as_results(retrieved_context)
+    report = {
+        "token_budget": budget,
+        "history_turns_kept": len(history),
+        "history_turns_dropped": 0,
+        "chunks_kept": len(results),
+        "chunks_truncated": 0,
+        "chunks_dropped": 0,
+        "dropped_sources": [],
+        "estimated_tokens": None,
+        "over_budget": False,
+    }
+    if not budget:
+        context = format_context(block["metadata"]["content"] if block.get("raw") else block for block in results)
+        return render_prompt(mode, user_query, history, context, output_format), report
+
+    # Count the chunks not seen before in one tokenizer batch (history is counted in _fit_history).
+    tokenization.count_tokens_batch([r["metadata"]["content"] if r.get("raw") else format_chunk(r) for r in results])
+    fixed = _count(render_prompt(mode, user_query, None, None, output_format))
+    fixed += _SECTION_TOKENS * (bool(history) + bool(results))
+    available = max(0, budget - fixed)
+    report["over_budget"] = fixed > budget
+
+    context_need = sum(_count(r["metadata"]["content"]) + _JOIN_TOKENS if r.get("raw") else _chunk_tokens(r)
+                       for r in results)
+    history, history_used = _fit_history(history, max(int(available * HISTORY_SHARE), available - context_need))
+    blocks, context_used = _fit_context(results, available - history_used, report)
+
+    report["history_turns_dropped"] = report["history_turns_kept"] - len(history)
+    report["history_turns_kept"] = len(history)
+    report["chunks_kept"] = len(blocks)
+    report["estimated_tokens"] = fixed + history_used + context_used
+    return render_prompt(mode, user_query, history, format_context(blocks), output_format), report
+
+
+def build_dynamic_prompt(user_query, conversation_history=None, retrieved_context=None, output_format=None,
+                         mode="summary", token_budget=None):
+    """
+    Master prompt builder selecting prompt template based on mode, trimmed to
+    token_budget (see build_dynamic_prompt_with_report).
+    """
+    prompt, _ = build_dynamic_prompt_with_report(
+        user_query, conversation_history, retrieved_context, output_format, mode, token_budget
+    )
+    return prompt
 
 
@@ -0,0 +1,175 @@
+"""
+core/embedding_cache.py
+=======================
+Content-addressed cache of embedding vectors for NextGenLingo.
+
+Entries are keyed by (model, output dimensionality, sha256(text)) and stored
+as float32 blobs in SQLite, with an in-memory LRU in front. The disk tier is
+capped at MAX_ENTRIES rows and evicts the least recently used rows first.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+EMBEDDING_CACHE_FILE = os.getenv("EMBEDDING_CACHE_FILE", "embedding_cache.db")
+ENABLED = os.getenv("EMBEDDING_CACHE", "1") != "0"
+MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "4096"))
+MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+_memory = OrderedDict()
+_conn = None
+_disk_entries = 0
+_lock = threading.Lock()
+
+
+def cache_key(model, dimensionality, text):
+    """Key for one text: model, output dimensionality (0 = model default) and sha256 of the text."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{dimensionality or 0}:{digest}"
+
+
+def _db():
+    global _conn, _disk_entries
+    if _conn is None:
+        _conn = sqlite3.connect(EMBEDDING_CACHE_FILE, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute(_SCHEMA)
+        _conn.commit()
+        _disk_entries = _conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    return _conn
+
+
+def _remember(key, vector):
+    _memory[key] = vector
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get_many(model, dimensionality, texts):
+    """Returns a list aligned with texts: a float32 vector for each hit, None for each miss."""
+    keys = [cache_key(model, dimensionality, text) for text in texts]
+    if not ENABLED:
+        stats["misses"] += len(keys)
+        return [None] * len(keys)
+
+    results = [None] * len(keys)
+    with _lock:
+        disk_lookup = {}
+        for i, key in enumerate(keys):
+            if key in _memory:
+                _memory.move_to_end(key)
+                results[i] = _memory[key]
+                stats["memory_hits"] += 1
+            else:
+                disk_lookup.setdefault(key, []).append(i)
+
+        if disk_lookup:
+            conn = _db()
+            found = {}
+            wanted = list(disk_lookup)
+            for start in range(0, len(wanted), 500):  # stay under SQLite's bound-parameter limit
+                part = wanted[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                found.update(conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall())
+
+            for key, positions in disk_lookup.items():
+                if key in found:
+                    vector = np.frombuffer(found[key], dtype=np.float32)
+                    _remember(key, vector)
+                    for i in positions:
+                        results[i] = vector
+                    stats["disk_hits"] += len(positions)
+                else:
+                    stats["misses"] += len(positions)
+
+            if found:
+                now = time.time()
+                with conn:
+                    conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                     [(now, key) for key in found])
+    return results
+
+
+def get(model, dimensionality, text):
+    """Cached float32 vector for one text, or None."""
+    return get_many(model, dimensionality, [text])[0]
+
+
+def put_many(model, dimensionality, texts, vectors):
+    """Stores one vector per text, evicting least recently used rows past MAX_ENTRIES."""
+    global _disk_entries
+    if not ENABLED or len(texts) == 0:
+        return
+
+    now = time.time()
+    rows = []
+    with _lock:
+        for text, vector in zip(texts, vectors):
+            key = cache_key(model, dimensionality, text)
+            vector = np.asarray(vector, dtype=np.float32)
+            _remember(key, vector)
+            rows.append((key, vector.tobytes(), now))
+
+        conn = _db()
+        with conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            _disk_entries += conn.total_changes - before
+            excess = _disk_entries - MAX_ENTRIES
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                _disk_entries -= excess
+                stats["evictions"] += excess
+
+
+def put(model, dimensionality, text, vector):
+    """Stores the vector for one text."""
+    put_many(model, dimensionality, [text], [vector])
+
+
+def cache_stats():
+    """Hit/miss counters plus current sizes of both tiers."""
+    total = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    return {
+        **stats,
+        "hit_rate": hits / total if total else 0.0,
+        "memory_entries": len(_memory),
+        "disk_entries": _disk_entries,
+    }
+
+
+def clear():
+    """Empties both tiers and resets the counters."""
+    global _disk_entries
+    with _lock:
+        _memory.clear()
+        conn = _db()
+        with conn:
+            conn.execute("DELETE FROM embeddings")
+        _disk_entries = 0
+        for name in stats:
+            stats[name] = 0
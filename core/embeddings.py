@@ -10,21 +10,43 @@ You can use these embeddings for:
 - Semantic search
 - Document similarity
 - Retrieval Augmented Generation (RAG) pipeline
+
+Use `generate_embeddings` for more than one text: it goes through the
+`batchEmbedContents` endpoint, up to 100 texts per HTTPS round trip.
+Both functions consult the content-addressed cache in embedding_cache.py
+first and only send texts that have not been embedded before.
 """
 
 import os
-import requests
-from dotenv import load_dotenv
+import re
+import numpy as np
+
+import embedding_cache
+import gemini_client
+import settings
 
-# Load API key from .env
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_KEY = settings.GEMINI_API_KEY
 
 # Correct Gemini Embedding endpoint
 GEMINI_EMBEDDING_URL = (
     "https://generativelanguage.googleapis.com/v1beta/models/"
     "gemini-embedding-001:embedContent"
 )
+GEMINI_BATCH_EMBEDDING_URL = (
+    "https://generativelanguage.googleapis.com/v1beta/models/"
+    "gemini-embedding-001:batchEmbedContents"
+)
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+# Optional reduced output size (e.g. 768); unset = the model default (3072).
+OUTPUT_DIMENSIONALITY = int(os.getenv("EMBEDDING_OUTPUT_DIM", "0")) or None
+
+# batchEmbedContents accepts at most 100 requests per call; the character cap
+# keeps a batch of long chunks under the request size limit.
+MAX_BATCH_SIZE = 100
+MAX_BATCH_CHARS = int(os.getenv("EMBEDDING_BATCH_MAX_CHARS", "200000"))
+# A 400 whose message matches this is a size rejection (payload, token or
+# request count); any other 400, such as a bad key, is not retried.
+_SIZE_ERROR = re.compile(r"too (large|long|many)|exceed|size limit", re.IGNORECASE)
 
 def generate_embedding(text: str):
     """
@@ -34,28 +56,49 @@ def generate_embedding(text: str):
     if not GEMINI_API_KEY:
         raise ValueError("❌ GEMINI_API_KEY not found in environment variables.")
 
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": GEMINI_API_KEY
-    }
+    cached = embedding_cache.get(EMBEDDING_MODEL, OUTPUT_DIMENSIONALITY, text)
+    if cached is not None:
+        return cached.tolist()
+
+    response = gemini_client.post(GEMINI_EMBEDDING_URL, _single_payload(text))
+    embedding_data = _parse_single(response)
+    embedding_cache.put(EMBEDDING_MODEL, OUTPUT_DIMENSIONALITY, text, embedding_data)
+    return embedding_data
 
-    # IMPORTANT: Use singular "content" and correct "embeddingConfig" key
+
+async def generate_embedding_async(text: str):
+    """
+    Async variant of generate_embedding for callers on the FastAPI event loop.
+    """
+    if not GEMINI_API_KEY:
+        raise ValueError("❌ GEMINI_API_KEY not found in environment variables.")
+
+    cached = embedding_cache.get(EMBEDDING_MODEL, OUTPUT_DIMENSIONALITY, text)
+    if cached is not None:
+        return cached.tolist()
+
+    response = await gemini_client.async_post(GEMINI_EMBEDDING_URL, _single_payload(text))
+    embedding_data = _parse_single(response)
+    embedding_cache.put(EMBEDDING_MODEL, OUTPUT_DIMENSIONALITY, text, embedding_data)
+    return embedding_data
+
+
+def _single_payload(text):
+    # IMPORTANT: Use singular "content"
     payload = {
-        "model": "models/gemini-embedding-001",
+        "model": EMBEDDING_MODEL,
         "content": {
             "parts": [
                 {"text": text}
             ]
         }
-        # "embeddingConfig" is optional in current API, remove if unsupported.
-        # Uncomment if you need specific dimensionality:
-        # ,
-        # "embeddingConfig": {
-        #     "outputDimensionality": 768
-        # }
     }
+    if OUTPUT_DIMENSIONALITY:
+        payload["outputDimensionality"] = OUTPUT_DIMENSIONALITY
+    return payload
 
-    response = requests.post(GEMINI_EMBEDDING_URL, headers=headers, json=payload)
+
+def _parse_single(response):
     response_json = response.json()
 
     if response.status_code != 200:
@@ -65,13 +108,158 @@ def generate_embedding(text: str):
     embedding_data = response_json.get("embedding", {}).get("values")
     if not embedding_data:
         raise Exception(f"❌ No embedding returned: {response_json}")
-
     return embedding_data
 
 
+def _batch_ranges(texts, batch_size, max_chars):
+    """Yields (start, end) slices of texts that respect both the count and size caps."""
+    start, chars = 0, 0
+    for i, text in enumerate(texts):
+        if i > start and (i - start >= batch_size or chars + len(text) > max_chars):
+            yield start, i
+            start, chars = i, 0
+        chars += len(text)
+    if start < len(texts):
+        yield start, len(texts)
+
+
+def _batch_payload(texts):
+    request_template = {"model": EMBEDDING_MODEL}
+    if OUTPUT_DIMENSIONALITY:
+        request_template["outputDimensionality"] = OUTPUT_DIMENSIONALITY
+    return {
+        "requests": [
+            {**request_template, "content": {"parts": [{"text": text}]}}
+            for text in texts
+        ]
+    }
+
+
+def _error_message(response):
+    try:
+        return response.json().get("error", {}).get("message", "")
+    except ValueError:
+        return response.text
+
+
+def _too_large(response, texts):
+    """True if a multi-text batch was rejected for its size: a 413, or a 400 about size limits."""
+    if len(texts) < 2:
+        return False
+    if response.status_code == 413:
+        return True
+    return response.status_code == 400 and bool(_SIZE_ERROR.search(_error_message(response)))
+
+
+def _embed_batch(texts):
+    """
+    Embeds one sub-batch with a single batchEmbedContents call.
+    Transient failures are retried by gemini_client for this sub-batch only;
+    a request rejected as too large is split in half and each half is sent
+    separately. Vectors are cached as soon as their request succeeds, so a
+    later failure does not throw them away.
+    """
+    response = gemini_client.post(GEMINI_BATCH_EMBEDDING_URL, _batch_payload(texts))
+    if _too_large(response, texts):
+        mid = len(texts) // 2
+        return _embed_batch(texts[:mid]) + _embed_batch(texts[mid:])
+    return _parse_batch(response, texts)
+
+
+async def _embed_batch_async(texts):
+    """Async variant of _embed_batch."""
+    response = await gemini_client.async_post(GEMINI_BATCH_EMBEDDING_URL, _batch_payload(texts))
+    if _too_large(response, texts):
+        mid = len(texts) // 2
+        return await _embed_batch_async(texts[:mid]) + await _embed_batch_async(texts[mid:])
+    return _parse_batch(response, texts)
+
+
+def _parse_batch(response, texts):
+    """Checks a batch response and caches its vectors; returns them in text order."""
+    response_json = response.json()
+    if response.status_code != 200:
+        raise Exception(f"❌ Batch embedding API call failed for {len(texts)} texts: {response_json}")
+
+    vectors = [item.get("values") for item in response_json.get("embeddings", [])]
+    if len(vectors) != len(texts) or not all(vectors):
+        raise Exception(f"❌ Expected {len(texts)} embeddings, got {len(vectors)}: {response_json}")
+    embedding_cache.put_many(EMBEDDING_MODEL, OUTPUT_DIMENSIONALITY, texts, vectors)
+    return vectors
+
+
+def generate_embeddings(texts, batch_size=MAX_BATCH_SIZE):
+    """
+    Generate embeddings for many texts using the batch endpoint.
+    Cached texts are not re-sent. Returns an (len(texts), dim) float32 NumPy
+    matrix in input order, ready for vector_store.add_document_embeddings.
+    """
+    if not GEMINI_API_KEY:
+        raise ValueError("❌ GEMINI_API_KEY not found in environment variables.")
+
+    texts = list(texts)
+    cached, missing, missing_texts = _split_cached(texts)
+
+    fresh = None
+    for start, end in _batch_ranges(missing_texts, max(1, min(batch_size, MAX_BATCH_SIZE)), MAX_BATCH_CHARS):
+        vectors = np.asarray(_embed_batch(missing_texts[start:end]), dtype=np.float32)
+        if fresh is None:
+            fresh = np.empty((len(missing_texts), vectors.shape[1]), dtype=np.float32)
+        fresh[start:end] = vectors
+    return _assemble(texts, cached, missing, missing_texts, fresh)
+
+
+async def generate_embeddings_async(texts, batch_size=MAX_BATCH_SIZE):
+    """
+    Async variant of generate_embeddings for callers on the FastAPI event loop.
+    """
+    if not GEMINI_API_KEY:
+        raise ValueError("❌ GEMINI_API_KEY not found in environment variables.")
+
+    texts = list(texts)
+    cached, missing, missing_texts = _split_cached(texts)
+
+    fresh = None
+    for start, end in _batch_ranges(missing_texts, max(1, min(batch_size, MAX_BATCH_SIZE)), MAX_BATCH_CHARS):
+        vectors = np.asarray(await _embed_batch_async(missing_texts[start:end]), dtype=np.float32)
+        if fresh is None:
+            fresh = np.empty((len(missing_texts), vectors.shape[1]), dtype=np.float32)
+        fresh[start:end] = vectors
+    return _assemble(texts, cached, missing, missing_texts, fresh)
+
+
+def _split_cached(texts):
+    """Returns (cached vectors or None per text, positions of misses, unique missing texts)."""
+    cached = embedding_cache.get_many(EMBEDDING_MODEL, OUTPUT_DIMENSIONALITY, texts)
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+    # Repeated texts within one call are embedded once.
+    missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+    return cached, missing, missing_texts
+
+
+def _assemble(texts, cached, missing, missing_texts, fresh):
+    """Builds the output matrix in input order (fresh vectors were cached per request)."""
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    dim = fresh.shape[1] if fresh is not None else cached[0].shape[0]
+    matrix = np.empty((len(texts), dim), dtype=np.float32)
+    for i, vector in enumerate(cached):
+        if vector is not None:
+            matrix[i] = vector
+    if fresh is not None:
+        fresh_row = {text: row for row, text in enumerate(missing_texts)}
+        for i in missing:
+            matrix[i] = fresh[fresh_row[texts[i]]]
+    return matrix
+
+
 if __name__ == "__main__":
     # Standalone test
     sample_text = "What is the capital of France?"
     embedding = generate_embedding(sample_text)
     print(f"✅ Embedding vector length: {len(embedding)}")
     print("🔹 First 10 values:", embedding[:10])
+
+    batch = generate_embeddings([sample_text, "Paris is the capital of France."])
+    print(f"✅ Batch embedding matrix shape: {batch.shape}")
+    print("🔹 Cache stats:", embedding_cache.cache_stats())
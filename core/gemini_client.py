@@ -0,0 +1,233 @@
+"""
+core/gemini_client.py
+=====================
+Shared HTTP client for all Gemini API calls in NextGenLingo.
+
+- One pooled `requests.Session`, so calls reuse keep-alive connections
+  instead of paying a TCP + TLS handshake each time.
+- Connect/read timeouts, so a hung upstream can't hang a worker.
+- Jittered exponential backoff on 429/5xx and connection errors.
+- Per-endpoint latency recording (see `latency_stats`).
+
+`async_post` is the same call on a pooled `httpx.AsyncClient`, for code
+running on the FastAPI event loop; `async_stream` reads a server-sent-events
+streaming endpoint on the same client.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import defaultdict, deque
+
+import settings
+
+# Imported on first use, so API startup does not pay for whichever client it never uses.
+httpx = settings.lazy_import("httpx")
+requests = settings.lazy_import("requests")
+
+GEMINI_API_KEY = settings.GEMINI_API_KEY
+
+CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", "60"))
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "20"))
+ASYNC_POOL_SIZE = int(os.getenv("GEMINI_ASYNC_POOL_SIZE", "100"))
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+
+_stats_lock = threading.Lock()
+_latencies = defaultdict(lambda: deque(maxlen=1000))
+_counters = defaultdict(lambda: {"calls": 0, "retries": 0, "errors": 0})
+
+
+def get_session():
+    """The process-wide pooled session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Content-Type": "application/json"})
+                _session = session
+    return _session
+
+
+def get_async_client():
+    """The pooled async client (created on first use, inside the running event loop)."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=ASYNC_POOL_SIZE, max_keepalive_connections=ASYNC_POOL_SIZE),
+            headers={"Content-Type": "application/json"},
+        )
+    return _async_client
+
+
+async def aclose():
+    """Closes the async client's pooled connections (call on app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than a server-sent Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass  # HTTP-date form; the jittered delay is good enough
+    return delay
+
+
+def endpoint_name(url):
+    """Short label for stats, e.g. 'gemini-2.0-flash:generateContent'."""
+    return url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+
+
+def record_latency(url, seconds, retries=0, error=False, label=None):
+    """Records one logical call (including its retries) for `latency_stats`."""
+    name = label or endpoint_name(url)
+    with _stats_lock:
+        _latencies[name].append(seconds)
+        counters = _counters[name]
+        counters["calls"] += 1
+        counters["retries"] += retries
+        counters["errors"] += error
+
+
+def post(url, payload, timeout=None):
+    """
+    POSTs a JSON payload to a Gemini endpoint and returns the final Response.
+    429/5xx responses and connection errors are retried up to MAX_RETRIES
+    times; the last response is returned even if it is still an error, so
+    callers keep their own error reporting. Raises requests exceptions only
+    when every attempt failed to connect.
+    """
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    headers = {"X-goog-api-key": GEMINI_API_KEY}
+    session = get_session()
+
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = session.post(url, headers=headers, json=payload, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= MAX_RETRIES:
+                record_latency(url, time.perf_counter() - start, attempt, error=True)
+                raise
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        if response.status_code in RETRYABLE_STATUS and attempt < MAX_RETRIES:
+            time.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+            continue
+
+        record_latency(url, time.perf_counter() - start, attempt, error=response.status_code != 200)
+        return response
+
+
+async def async_post(url, payload, timeout=None):
+    """Async variant of `post`: same retries, backoff and latency recording, without blocking the event loop."""
+    headers = {"X-goog-api-key": GEMINI_API_KEY}
+    client = get_async_client()
+    extra = {"timeout": httpx.Timeout(timeout)} if timeout else {}  # else the client's (connect, read) defaults
+
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = await client.post(url, headers=headers, json=payload, **extra)
+        except httpx.TransportError:
+            if attempt >= MAX_RETRIES:
+                record_latency(url, time.perf_counter() - start, attempt, error=True)
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        if response.status_code in RETRYABLE_STATUS and attempt < MAX_RETRIES:
+            await asyncio.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+            continue
+
+        record_latency(url, time.perf_counter() - start, attempt, error=response.status_code != 200)
+        return response
+
+
+async def async_stream(url, payload):
+    """
+    POSTs to a Gemini streaming endpoint (`?alt=sse`) and yields each event's
+    parsed JSON as it arrives. Connection errors and 429/5xx are retried like
+    `async_post` until the stream has started; after that, errors propagate.
+    Closing the generator (e.g. the client disconnected) closes the upstream
+    connection. Time to first event is recorded as '<endpoint> first event'.
+    """
+    headers = {"X-goog-api-key": GEMINI_API_KEY}
+    client = get_async_client()
+
+    start = time.perf_counter()
+    attempt = 0
+    started = False
+    while True:
+        retry_after = None
+        try:
+            async with client.stream("POST", url, headers=headers, json=payload) as response:
+                if response.status_code in RETRYABLE_STATUS and attempt < MAX_RETRIES:
+                    retry_after = response.headers.get("Retry-After")
+                elif response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    record_latency(url, time.perf_counter() - start, attempt, error=True)
+                    raise Exception(f"Gemini API call failed: {body}")
+                else:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        if not started:
+                            started = True
+                            record_latency(url, time.perf_counter() - start, attempt,
+                                           label=f"{endpoint_name(url)} first event")
+                        yield json.loads(line[len("data:"):])
+                    record_latency(url, time.perf_counter() - start, attempt)
+                    return
+        except httpx.TransportError:
+            if started or attempt >= MAX_RETRIES:
+                record_latency(url, time.perf_counter() - start, attempt, error=True)
+                raise
+
+        await asyncio.sleep(backoff_delay(attempt, retry_after))
+        attempt += 1
+
+
+def latency_stats():
+    """Per-endpoint call counts and p50/p95/p99 latency (ms) over the last 1000 calls."""
+    report = {}
+    with _stats_lock:
+        for name, samples in _latencies.items():
+            ordered = sorted(samples)
+            pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+            report[name] = {
+                **_counters[name],
+                "p50_ms": pick(0.50),
+                "p95_ms": pick(0.95),
+                "p99_ms": pick(0.99),
+            }
+    return report
@@ -0,0 +1,365 @@
+"""
+core/ingestion.py
+=================
+Pipelined document ingestion for NextGenLingo uploads.
+
+Files flow through four stages connected by bounded queues:
+
+    parse -> chunk -> embed -> index
+
+so parsing file 2 overlaps embedding file 1, and up to EMBED_CONCURRENCY
+embedding batches are in flight at once. The bounded queues keep a fast
+parser from buffering a whole upload's worth of text ahead of embedding.
+`ingest_files` returns per-stage throughput and queue depths so it is easy
+to see which stage is saturated.
+
+PDF text extraction is CPU-bound, so it runs in a process pool: page ranges
+of PAGES_PER_TASK pages are extracted in parallel and released in page
+order as they finish. Chunks (token-aware, see chunking.py) never span
+pages and carry their page number.
+
+Memory stays bounded regardless of file size: uploads are spooled to disk,
+TXT files are decoded READ_BLOCK_BYTES at a time, at most PDF_WINDOW page
+ranges are in flight, and `iter_chunks` yields chunks lazily so callers
+embed them batch by batch instead of building a full chunk list.
+"""
+
+import os
+import time
+import codecs
+import shutil
+import asyncio
+import tempfile
+from collections import deque
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+
+import chunking
+import embeddings
+import settings
+import vector_store
+
+# Only upload paths need it; imported on first PDF.
+pdfplumber = settings.lazy_import("pdfplumber")
+
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "100"))
+EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+PARSE_CONCURRENCY = int(os.getenv("INGEST_PARSE_CONCURRENCY", "2"))
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+PDF_PROCESSES = int(os.getenv("PDF_PROCESSES", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+PDF_WINDOW = int(os.getenv("PDF_WINDOW", str(2 * PDF_PROCESSES)))  # page ranges in flight
+READ_BLOCK_BYTES = int(os.getenv("INGEST_READ_BLOCK_BYTES", str(1 << 20)))
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")  # Further formats can be added here
+
+_DONE = object()  # end-of-stream marker passed down the queues
+_pdf_pool = None
+
+
+def is_supported(filename):
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def get_pdf_pool():
+    """The shared PDF extraction process pool (created on first use)."""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_PROCESSES)
+    return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(cancel_futures=True)
+        _pdf_pool = None
+
+
+def _count_pages(path):
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_page_range(path, first, last):
+    """Text of pages first..last-1 (0-based); runs in a pool process."""
+    with pdfplumber.open(path, pages=list(range(first + 1, last + 1))) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+async def extract_pdf_pages(path, pool=None, window=None):
+    """
+    Yields (page number, text) for a PDF file, 1-based and in page order.
+    Up to `window` page ranges are extracted in parallel; each range is
+    yielded as soon as it and the ranges before it are done.
+    """
+    pool = pool or get_pdf_pool()
+    window = window or PDF_WINDOW
+    page_count = await asyncio.to_thread(_count_pages, path)
+    loop = asyncio.get_running_loop()
+    starts = iter(range(0, page_count, PAGES_PER_TASK))
+    in_flight = deque()
+
+    def submit_next():
+        first = next(starts, None)
+        if first is not None:
+            last = min(first + PAGES_PER_TASK, page_count)
+            in_flight.append((first, loop.run_in_executor(pool, _extract_page_range, path, first, last)))
+
+    try:
+        for _ in range(window):
+            submit_next()
+        while in_flight:
+            first, future = in_flight.popleft()
+            texts = await future
+            submit_next()
+            for offset, text in enumerate(texts):
+                yield first + offset + 1, text
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
+
+async def extract_pages(filename, path):
+    """
+    Yields (page number, text) for an uploaded file stored at `path`. TXT
+    files are read in blocks of READ_BLOCK_BYTES, all with page number None.
+    Raises ValueError for unsupported formats.
+    """
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        async for page in extract_pdf_pages(path):
+            yield page
+    elif name.endswith(".txt"):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        with open(path, "rb") as f:
+            while (text := await asyncio.to_thread(_read_text_block, f, decoder)) is not None:
+                yield None, text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield None, tail
+    else:
+        raise ValueError("Unsupported file format. Please upload PDF or TXT.")
+
+
+def _read_text_block(f, decoder):
+    """The next READ_BLOCK_BYTES of a TXT file, decoded, or None at end of file."""
+    block = f.read(READ_BLOCK_BYTES)
+    if not block:
+        return None
+    return decoder.decode(block)
+
+
+def chunk_metadata(filename, chunk_number, text, page=None, tokens=None):
+    """Metadata stored with one chunk; `page` is set for PDF chunks, `tokens` when known."""
+    item = {"id": f"{filename}-{chunk_number}", "source": filename, "content": text}
+    if page is not None:
+        item["page"] = page
+    if tokens is not None:
+        item["tokens"] = tokens
+    return item
+
+
+def write_upload(source, f):
+    """Copies an upload (bytes or a binary file object) into the open file `f` block by block."""
+    if isinstance(source, (bytes, bytearray)):
+        f.write(source)
+    else:
+        shutil.copyfileobj(source, f, READ_BLOCK_BYTES)
+
+
+def _spool(filename, source):
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        write_upload(source, f)
+        return f.name
+
+
+def new_chunker():
+    """State for `feed_chunks`: the current page and text not yet long enough for a chunk."""
+    return {"page": None, "carry": ""}
+
+
+def feed_chunks(chunker, page, text):
+    """
+    Feeds one extracted piece of text to the token-aware chunker (see
+    chunking.py) and returns the (page, chunk, token count) triples it
+    completes. The unfinished tail is carried over to the next piece of the
+    same page, so TXT blocks chunk like one long string; a new page (or
+    page=_DONE at end of file) flushes it. Tokenizing a block takes a while,
+    so async callers run this in a thread.
+    """
+    finished = []
+    if chunker["carry"] and page != chunker["page"]:
+        [(chunks, _)] = chunking.split_texts([chunker["carry"]])
+        finished.extend((chunker["page"], piece, tokens) for piece, tokens in chunks)
+        chunker["carry"] = ""
+    chunker["page"] = page
+    if page is _DONE:
+        return finished
+    [(chunks, chunker["carry"])] = chunking.split_texts([chunker["carry"] + text], final=False)
+    finished.extend((page, piece, tokens) for piece, tokens in chunks)
+    return finished
+
+
+async def iter_chunks(filename, path):
+    """Yields the chunk metadata of an uploaded file lazily, in chunk order."""
+    chunker = new_chunker()
+    number = 0
+    async with aclosing(extract_pages(filename, path)) as pages:
+        async for page, text in pages:
+            for chunk_page, piece, tokens in await asyncio.to_thread(feed_chunks, chunker, page, text):
+                yield chunk_metadata(filename, number, piece, chunk_page, tokens)
+                number += 1
+    for chunk_page, piece, tokens in await asyncio.to_thread(feed_chunks, chunker, _DONE, ""):
+        yield chunk_metadata(filename, number, piece, chunk_page, tokens)
+        number += 1
+
+
+def _new_stage():
+    """Busy time and item counts for one stage, plus depth samples of its input queue."""
+    return {"items": 0, "chunks": 0, "skipped": 0, "busy_seconds": 0.0, "depth_samples": []}
+
+
+def _stage_report(stage):
+    depths = stage["depth_samples"] or [0]
+    busy = stage["busy_seconds"]
+    return {
+        "items": stage["items"],
+        "chunks": stage["chunks"],
+        "busy_seconds": round(busy, 3),
+        "items_per_sec": round(stage["items"] / busy, 1) if busy else None,
+        "chunks_per_sec": round(stage["chunks"] / busy, 1) if busy and stage["chunks"] else None,
+        "input_queue_max": max(depths),
+        "input_queue_avg": round(sum(depths) / len(depths), 2),
+    }
+
+
+async def _get(queue, stage):
+    stage["depth_samples"].append(queue.qsize())
+    return await queue.get()
+
+
+async def ingest_files(files, embed_concurrency=None):
+    """
+    Ingests a list of (filename, bytes or binary file object) pairs through the pipeline.
+    Unsupported formats are skipped; the parse stage counts pages. Returns
+    {"chunks_added": n, "chunks_skipped": duplicates, "files": {filename: chunks},
+     "stages": {...}, "seconds": t}.
+    """
+    embed_concurrency = embed_concurrency or EMBED_CONCURRENCY
+    parse_workers = max(1, min(PARSE_CONCURRENCY, len(files)))
+    stats = {name: _new_stage() for name in ("parse", "chunk", "embed", "index")}
+    files_q = asyncio.Queue()
+    parsed_q = asyncio.Queue(maxsize=QUEUE_SIZE)
+    batch_q = asyncio.Queue(maxsize=QUEUE_SIZE)
+    embedded_q = asyncio.Queue(maxsize=QUEUE_SIZE)
+    per_file = {}
+
+    for position, item in enumerate(files):
+        files_q.put_nowait((position, item))
+    for _ in range(parse_workers):
+        files_q.put_nowait(_DONE)
+
+    async def parse():
+        while (item := await _get(files_q, stats["parse"])) is not _DONE:
+            position, (filename, content) = item
+            if not is_supported(filename):
+                continue
+            path = await asyncio.to_thread(_spool, filename, content)
+            try:
+                async with aclosing(extract_pages(filename, path)) as pages:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            page, text = await anext(pages)
+                        except StopAsyncIteration:
+                            break
+                        stats["parse"]["busy_seconds"] += time.perf_counter() - start
+                        stats["parse"]["items"] += 1  # pages
+                        await parsed_q.put((position, filename, page, text))
+            finally:
+                os.remove(path)
+            await parsed_q.put((position, filename, _DONE, ""))  # end of this file
+        await parsed_q.put(_DONE)
+
+    async def chunk():
+        remaining = parse_workers
+        # Per upload (keyed by position in `files`, as names can repeat): chunker
+        # state, chunk metadata not yet sent to embedding. Chunk numbers run per
+        # filename, so same-named uploads still get distinct ids.
+        chunkers, batches = {}, {}
+        while remaining:
+            item = await _get(parsed_q, stats["chunk"])
+            if item is _DONE:
+                remaining -= 1
+                continue
+            position, filename, page, text = item
+            start = time.perf_counter()
+            pieces = await asyncio.to_thread(feed_chunks, chunkers.setdefault(position, new_chunker()), page, text)
+            stats["chunk"]["busy_seconds"] += time.perf_counter() - start
+            stats["chunk"]["chunks"] += len(pieces)
+            batch = batches.setdefault(position, [])
+            for chunk_page, piece, tokens in pieces:
+                batch.append(chunk_metadata(filename, per_file.get(filename, 0), piece, chunk_page, tokens))
+                per_file[filename] = per_file.get(filename, 0) + 1
+                if len(batch) == EMBED_BATCH_SIZE:
+                    await batch_q.put(batch)
+                    batch = batches[position] = []
+
+            if page is _DONE:  # end of this file
+                del chunkers[position], batches[position]
+                if batch:
+                    await batch_q.put(batch)
+            else:
+                stats["chunk"]["items"] += 1
+        for _ in range(embed_concurrency):
+            await batch_q.put(_DONE)
+
+    async def embed():
+        while (metas := await _get(batch_q, stats["embed"])) is not _DONE:
+            metas, skipped = await asyncio.to_thread(vector_store.filter_new_chunks, metas)
+            stats["index"]["skipped"] += skipped
+            if not metas:
+                continue
+            start = time.perf_counter()
+            vectors = await embeddings.generate_embeddings_async([meta["content"] for meta in metas])
+            # Wall time per batch; with several workers these overlap.
+            stats["embed"]["busy_seconds"] += time.perf_counter() - start
+            stats["embed"]["items"] += 1
+            stats["embed"]["chunks"] += len(metas)
+            await embedded_q.put((vectors, metas))
+        await embedded_q.put(_DONE)
+
+    async def index():
+        remaining = embed_concurrency
+        while remaining:
+            item = await _get(embedded_q, stats["index"])
+            if item is _DONE:
+                remaining -= 1
+                continue
+            vectors, metas = item
+            start = time.perf_counter()
+            added = await asyncio.to_thread(vector_store.add_document_embeddings, vectors, metas)
+            stats["index"]["busy_seconds"] += time.perf_counter() - start
+            stats["index"]["items"] += 1
+            stats["index"]["chunks"] += added
+            stats["index"]["skipped"] += len(metas) - added
+
+    started = time.perf_counter()
+    async with asyncio.TaskGroup() as group:
+        for _ in range(parse_workers):
+            group.create_task(parse())
+        group.create_task(chunk())
+        for _ in range(embed_concurrency):
+            group.create_task(embed())
+        group.create_task(index())
+
+    report = {
+        "chunks_added": stats["index"]["chunks"],
+        "chunks_skipped": stats["index"]["skipped"],
+        "files": per_file,
+        "stages": {name: _stage_report(stage) for name, stage in stats.items()},
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    print("Ingestion pipeline:", report)
+    return report
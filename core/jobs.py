@@ -0,0 +1,237 @@
+"""
+core/jobs.py
+============
+Background ingestion jobs for NextGenLingo.
+
+`/upload` spools the file to disk, records a job in SQLite and returns at
+once; a bounded pool of worker tasks drains the job queue. Each job streams
+chunks from its file and embeds and indexes them batch by batch, persisting
+`chunks_done` after every batch (`total_chunks` is known once the whole file
+has been read). Chunks already in the store are skipped and counted in
+`chunks_skipped`. Jobs still queued or running when the server stops are
+re-queued on the next start and resume after the last persisted chunk.
+
+A crash between indexing a batch and recording it means that one batch is
+indexed again on resume; everything before it is skipped.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from contextlib import aclosing
+
+import embeddings
+import vector_store
+import ingestion
+
+JOBS_DB_FILE = os.getenv("INGEST_JOBS_DB", "ingestion_jobs.db")
+SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "ingestion_spool")
+WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+BATCH_SIZE = ingestion.EMBED_BATCH_SIZE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    spool_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_chunks INTEGER,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    chunks_skipped INTEGER NOT NULL DEFAULT 0,
+    errors TEXT NOT NULL DEFAULT '[]',
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+_conn = None
+_lock = threading.Lock()
+_queue = None
+_loop = None  # the workers' event loop; submit() may run on another thread
+_workers = []
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(JOBS_DB_FILE, check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(_SCHEMA)
+        columns = [row[1] for row in _conn.execute("PRAGMA table_info(jobs)")]
+        if "chunks_skipped" not in columns:  # databases from before deduplication
+            _conn.execute("ALTER TABLE jobs ADD COLUMN chunks_skipped INTEGER NOT NULL DEFAULT 0")
+        _conn.commit()
+    return _conn
+
+
+def _update(job_id, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _load(job_id):
+    with _lock:
+        return _db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def _add_error(job_id, message):
+    row = _load(job_id)
+    errors = json.loads(row["errors"]) + [message]
+    _update(job_id, errors=json.dumps(errors))
+
+
+def get_job(job_id):
+    """Status of one job, or None if the id is unknown."""
+    row = _load(job_id)
+    if row is None:
+        return None
+    end = row["finished_at"] or time.time()
+    elapsed = end - row["started_at"] if row["started_at"] else 0.0
+    return {
+        "id": row["id"],
+        "filename": row["filename"],
+        "status": row["status"],
+        "total_chunks": row["total_chunks"],
+        "chunks_processed": row["chunks_done"],
+        "chunks_skipped": row["chunks_skipped"],
+        "chunks_per_sec": round(row["chunks_done"] / elapsed, 1) if elapsed else None,
+        "errors": json.loads(row["errors"]),
+    }
+
+
+def submit(filename, source):
+    """
+    Spools an upload (bytes or a binary file object, copied block by block)
+    to disk, records a queued job and returns its id. Safe to call from a
+    worker thread (e.g. via asyncio.to_thread).
+    """
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    spool_path = os.path.join(SPOOL_DIR, job_id)
+    with open(spool_path, "wb") as f:
+        ingestion.write_upload(source, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, filename, spool_path, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, filename, spool_path, time.time()),
+            )
+    if _queue is not None:
+        if _running_loop() is _loop:
+            _queue.put_nowait(job_id)
+        else:
+            # asyncio.Queue is not thread-safe; hand the id to the workers' loop.
+            _loop.call_soon_threadsafe(_queue.put_nowait, job_id)
+    return job_id
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+async def _run(job_id):
+    row = _load(job_id)
+    filename = row["filename"]
+    done = row["chunks_done"]
+    _update(job_id, status="running", started_at=row["started_at"] or time.time())
+
+    # Chunks are produced lazily, so only one batch of text is in memory at a time.
+    number = 0
+    batch = []
+    async with aclosing(ingestion.iter_chunks(filename, row["spool_path"])) as chunks:
+        async for meta in chunks:
+            number += 1
+            if number <= done:
+                continue  # indexed before a restart
+            batch.append(meta)
+            if len(batch) == BATCH_SIZE:
+                await _index_batch(job_id, batch, number)
+                batch = []
+    if batch:
+        await _index_batch(job_id, batch, number)
+    _update(job_id, total_chunks=number)
+    if done:
+        print(f"Resumed job {job_id} ({filename}) after chunk {done}/{number}")
+
+
+async def _index_batch(job_id, batch, chunks_done):
+    """Embeds and indexes one batch, skipping chunks already in the store."""
+    new, skipped = await asyncio.to_thread(vector_store.filter_new_chunks, batch)
+    if new:
+        vectors = await embeddings.generate_embeddings_async([meta["content"] for meta in new])
+        added = await asyncio.to_thread(vector_store.add_document_embeddings, vectors, new)
+        skipped += len(new) - added
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute("UPDATE jobs SET chunks_done = ?, chunks_skipped = chunks_skipped + ? WHERE id = ?",
+                         (chunks_done, skipped, job_id))
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run(job_id)
+        except asyncio.CancelledError:
+            raise  # shutdown: leave the job "running" so it resumes on restart
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed:", e)
+            _add_error(job_id, str(e))
+            _update(job_id, status="failed", finished_at=time.time())
+            _remove_spool(job_id)  # failed jobs are not resumed
+        else:
+            _update(job_id, status="done", finished_at=time.time())
+            _remove_spool(job_id)
+        finally:
+            _queue.task_done()
+
+
+def _remove_spool(job_id):
+    row = _load(job_id)
+    if os.path.exists(row["spool_path"]):
+        os.remove(row["spool_path"])
+
+
+async def start_workers(count=None):
+    """Starts the worker pool and re-queues jobs left unfinished by a previous run."""
+    global _queue, _loop
+    _loop = asyncio.get_running_loop()
+    _queue = asyncio.Queue()
+    with _lock:
+        pending = _db().execute(
+            "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+    for row in pending:
+        _queue.put_nowait(row["id"])
+    if pending:
+        print(f"Re-queued {len(pending)} unfinished ingestion job(s).")
+
+    for _ in range(count or WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_workers():
+    """Cancels the worker pool; interrupted jobs resume on the next start."""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
@@ -0,0 +1,173 @@
+"""
+core/llm_cache.py
+=================
+Opt-in exact-prompt cache of Gemini responses for NextGenLingo.
+
+Keys are sha256 of (model endpoint, prompt, canonical generation_config),
+so only byte-identical requests hit. Only deterministic requests are
+cached: no generation_config, temperature 0 or topK 1. Anything that
+samples (temperature > 0, or topP/topK without temperature 0) always goes
+to the API.
+
+Off by default. Turn it on with LLM_CACHE=1 (memory only) and add
+LLM_CACHE_FILE=<path> for a SQLite tier that survives restarts, or call
+`enable()` from scripts such as testing.py.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import gemini_client
+
+ENABLED = os.getenv("LLM_CACHE", "0") == "1"
+CACHE_FILE = os.getenv("LLM_CACHE_FILE", "")  # empty = memory only
+MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+# Keys that make Gemini sample; with any of them (and no temperature 0) a response is not reproducible.
+_SAMPLING_KEYS = ("temperature", "topP", "topK")
+
+stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+_memory = OrderedDict()
+_conn = None
+_disk_entries = 0
+_lock = threading.Lock()
+
+
+def enable(cache_file=None):
+    """Turns the cache on, optionally with a disk tier at cache_file."""
+    global ENABLED, CACHE_FILE, _conn
+    ENABLED = True
+    if cache_file is not None and cache_file != CACHE_FILE:
+        CACHE_FILE = cache_file
+        with _lock:
+            if _conn is not None:
+                _conn.close()
+                _conn = None
+
+
+def _camel(name):
+    head, *rest = name.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+def canonical_config(generation_config):
+    """generation_config with camelCase keys, no None values and numbers as floats, as sorted JSON."""
+    config = {}
+    for name, value in (generation_config or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        config[_camel(name)] = value
+    return json.dumps(config, sort_keys=True, separators=(",", ":"))
+
+
+def is_deterministic(generation_config):
+    """True for default settings, temperature 0 or greedy topK 1."""
+    config = json.loads(canonical_config(generation_config))
+    if "temperature" in config:
+        return config["temperature"] == 0
+    if config.get("topK") == 1:
+        return True
+    return not any(name in config for name in _SAMPLING_KEYS)
+
+
+def cache_key(url, prompt_text, generation_config=None):
+    """Cache key for a request, or None when caching is off or the request samples."""
+    if not ENABLED:
+        return None
+    if not is_deterministic(generation_config):
+        stats["bypassed"] += 1
+        return None
+    raw = json.dumps([gemini_client.endpoint_name(url), prompt_text, canonical_config(generation_config)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _db():
+    global _conn, _disk_entries
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_FILE, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute(_SCHEMA)
+        _conn.commit()
+        _disk_entries = _conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    return _conn
+
+
+def _remember(key, response):
+    _memory[key] = response
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get(key):
+    """Cached response text for a key from `cache_key`, or None."""
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            stats["memory_hits"] += 1
+            return _memory[key]
+        if CACHE_FILE:
+            conn = _db()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                _remember(key, row[0])
+                stats["disk_hits"] += 1
+                return row[0]
+        stats["misses"] += 1
+        return None
+
+
+def put(key, response):
+    """Stores a response, evicting least recently used disk rows past MAX_ENTRIES."""
+    global _disk_entries
+    with _lock:
+        _remember(key, response)
+        if not CACHE_FILE:
+            return
+        conn = _db()
+        with conn:
+            before = conn.total_changes
+            conn.execute("INSERT OR IGNORE INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                         (key, response, time.time()))
+            _disk_entries += conn.total_changes - before
+            excess = _disk_entries - MAX_ENTRIES
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                _disk_entries -= excess
+                stats["evictions"] += excess
+
+
+def cache_stats():
+    """Hit/miss counters plus current sizes of both tiers."""
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    total = hits + stats["misses"]
+    return {
+        **stats,
+        "enabled": ENABLED,
+        "hit_rate": hits / total if total else 0.0,
+        "memory_entries": len(_memory),
+        "disk_entries": _disk_entries,
+    }
@@ -0,0 +1,248 @@
+"""
+core/metadata_store.py
+======================
+SQLite-backed chunk metadata for the NextGenLingo vector store.
+
+Rows are keyed by FAISS vector id, so a search only reads back the rows it
+returns. Chunk text ("content") is kept in its own column and is only loaded
+when a caller asks for it. Each row also stores a hash of its normalized
+content, so ingest can skip chunks that are already stored. A small
+settings table records store-wide facts such as the distance metric.
+
+Migrate an existing JSON metadata file (run from the core folder):
+    python metadata_store.py vector_store_meta.json vector_store_meta.db
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    meta TEXT NOT NULL,
+    content TEXT,
+    content_hash TEXT
+)
+"""
+_SETTINGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+_HASH_INDEX = "CREATE INDEX IF NOT EXISTS chunks_content_hash ON chunks (content_hash)"
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # FULL keeps a committed insert durable across power loss, matching the vector WAL.
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute(_SCHEMA)
+    conn.execute(_SETTINGS_SCHEMA)
+    _add_hash_column(conn)
+    conn.execute(_HASH_INDEX)
+    conn.commit()
+    return conn
+
+
+def _add_hash_column(conn):
+    """Adds and backfills content_hash on databases created before it existed."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(chunks)")]
+    if "content_hash" in columns:
+        return
+    conn.execute("ALTER TABLE chunks ADD COLUMN content_hash TEXT")
+    rows = conn.execute("SELECT id, content FROM chunks WHERE content IS NOT NULL").fetchall()
+    conn.executemany("UPDATE chunks SET content_hash = ? WHERE id = ?",
+                     [(content_hash(content), row_id) for row_id, content in rows])
+    print(f"Added content hashes to {len(rows)} metadata rows.")
+
+
+def content_hash(text):
+    """
+    sha256 of the text after Unicode (NFKC) normalization, case folding and
+    whitespace collapsing, so trivially different copies of a chunk match.
+    None for missing text.
+    """
+    if text is None:
+        return None
+    normalized = " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def open_store(path):
+    """Opens (creating if needed) the metadata database at `path`."""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+        _conn = _connect(path)
+
+
+def close_store():
+    """Closes the database connection, if open."""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def backup(dest_path):
+    """Writes a consistent copy of the open database, including WAL contents, to dest_path."""
+    with _lock:
+        dest = sqlite3.connect(dest_path)
+        try:
+            _conn.backup(dest)
+        finally:
+            dest.close()
+
+
+def database_files(path):
+    """All files SQLite may create for the database at `path`."""
+    return [path, path + "-wal", path + "-shm"]
+
+
+def _split(item):
+    """Splits a metadata dict into (json of everything but content, content, content hash)."""
+    meta = dict(item)
+    content = meta.pop("content", None)
+    return json.dumps(meta), content, content_hash(content)
+
+
+def _join(meta_json, content, include_content):
+    item = json.loads(meta_json)
+    if include_content and content is not None:
+        item["content"] = content
+    return item
+
+
+def put_many(start_id, items):
+    """Stores items under ids start_id, start_id + 1, ... in one transaction."""
+    rows = [(start_id + i, *_split(item)) for i, item in enumerate(items)]
+    with _lock:
+        with _conn:
+            _conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, meta, content, content_hash) VALUES (?, ?, ?, ?)", rows
+            )
+
+
+def get_many(ids, include_content=True):
+    """Returns {id: metadata dict} for the ids that exist."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    columns = "id, meta, content" if include_content else "id, meta, NULL"
+    placeholders = ",".join("?" * len(ids))
+    with _lock:
+        rows = _conn.execute(f"SELECT {columns} FROM chunks WHERE id IN ({placeholders})", ids).fetchall()
+    return {row[0]: _join(row[1], row[2], include_content) for row in rows}
+
+
+def get_setting(name, default=None):
+    """Stored value of a store-wide setting, or default."""
+    with _lock:
+        row = _conn.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+    return row[0] if row is not None else default
+
+
+def set_setting(name, value):
+    """Stores a store-wide setting."""
+    with _lock:
+        with _conn:
+            _conn.execute("INSERT OR REPLACE INTO settings (name, value) VALUES (?, ?)", (name, str(value)))
+
+
+def existing_hashes(hashes):
+    """The subset of the given content hashes that are already stored."""
+    wanted = list({h for h in hashes if h is not None})
+    found = set()
+    with _lock:
+        for start in range(0, len(wanted), 500):  # stay under SQLite's bound-parameter limit
+            part = wanted[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            found.update(row[0] for row in _conn.execute(
+                f"SELECT content_hash FROM chunks WHERE content_hash IN ({placeholders})", part
+            ))
+    return found
+
+
+def all_items():
+    """Returns [(id, metadata dict with content, content hash)] for every row, in id order."""
+    with _lock:
+        rows = _conn.execute("SELECT id, meta, content, content_hash FROM chunks ORDER BY id").fetchall()
+    return [(row[0], _join(row[1], row[2], True), row[3]) for row in rows]
+
+
+def replace_all(items):
+    """Replaces every row with `items`, stored under ids 0, 1, ... in one transaction."""
+    rows = [(i, *_split(item)) for i, item in enumerate(items)]
+    with _lock:
+        with _conn:
+            _conn.execute("DELETE FROM chunks")
+            _conn.executemany(
+                "INSERT INTO chunks (id, meta, content, content_hash) VALUES (?, ?, ?, ?)", rows
+            )
+
+
+def count():
+    """Number of stored rows."""
+    with _lock:
+        return _conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+def delete_from(first_id):
+    """Deletes rows with id >= first_id (metadata written for vectors that never made it to the index)."""
+    with _lock:
+        with _conn:
+            return _conn.execute("DELETE FROM chunks WHERE id >= ?", (first_id,)).rowcount
+
+
+def _legacy_item(item):
+    """Older upload rows keep their chunk under "text"; store it as "content" like newer rows."""
+    if "content" not in item and "text" in item:
+        item = dict(item)
+        item["content"] = item.pop("text")
+    return item
+
+
+def migrate_from_json(json_path, db_path):
+    """
+    Copies a legacy JSON metadata list into a new database (list position =
+    vector id) and returns the number of rows written. Chunk text stored
+    under "text" is moved to "content" (and hashed). An empty or corrupt
+    JSON file migrates as zero rows.
+    """
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+    except json.JSONDecodeError:
+        print(f"Warning: {json_path} is empty or corrupted, nothing to migrate.")
+        items = []
+
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, meta, content, content_hash) VALUES (?, ?, ?, ?)",
+                ((i, *_split(_legacy_item(item))) for i, item in enumerate(items)),
+            )
+    finally:
+        conn.close()
+    return len(items)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python metadata_store.py <vector_store_meta.json> <vector_store_meta.db>")
+    if os.path.exists(sys.argv[2]):
+        sys.exit(f"{sys.argv[2]} already exists; refusing to overwrite.")
+    print(f"Migrated {migrate_from_json(sys.argv[1], sys.argv[2])} metadata rows into {sys.argv[2]}.")
@@ -1,25 +1,13 @@
-import os
-import requests
-from dotenv import load_dotenv
+import gemini_client
+import llm_cache
+import settings
 
-# Load Gemini API key securely from environment
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_KEY = settings.GEMINI_API_KEY
 
 GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse"
 
-def call_gemini_api(prompt_text, generation_config=None):
-    """
-    Core Gemini API call helper.
-    - prompt_text: str, the combined prompt text (system + examples + user question)
-    - generation_config: dict, optional parameters like temperature, topK, topP
-    Returns the generated text response.
-    """
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": GEMINI_API_KEY
-    }
-
+def _build_request(prompt_text, generation_config=None):
     data = {
         "contents": [
             {
@@ -32,8 +20,10 @@ def call_gemini_api(prompt_text, generation_config=None):
 
     if generation_config:
         data["generationConfig"] = generation_config
+    return data
 
-    response = requests.post(GEMINI_URL, headers=headers, json=data)
+
+def _extract_text(response):
     response_json = response.json()
 
     if response.status_code != 200:
@@ -42,6 +32,53 @@ def call_gemini_api(prompt_text, generation_config=None):
     return response_json["candidates"][0]["content"]["parts"][0]["text"]
 
 
+def call_gemini_api(prompt_text, generation_config=None):
+    """
+    Core Gemini API call helper.
+    - prompt_text: str, the combined prompt text (system + examples + user question)
+    - generation_config: dict, optional parameters like temperature, topK, topP
+    Returns the generated text response. Deterministic calls are served from
+    llm_cache.py when it is enabled.
+    """
+    key = llm_cache.cache_key(GEMINI_URL, prompt_text, generation_config)
+    if key is not None and (cached := llm_cache.get(key)) is not None:
+        return cached
+
+    response = gemini_client.post(GEMINI_URL, _build_request(prompt_text, generation_config))
+    text = _extract_text(response)
+    if key is not None:
+        llm_cache.put(key, text)
+    return text
+
+
+async def call_gemini_api_async(prompt_text, generation_config=None):
+    """
+    Async variant of call_gemini_api for callers on the FastAPI event loop.
+    """
+    key = llm_cache.cache_key(GEMINI_URL, prompt_text, generation_config)
+    if key is not None and (cached := llm_cache.get(key)) is not None:
+        return cached
+
+    response = await gemini_client.async_post(GEMINI_URL, _build_request(prompt_text, generation_config))
+    text = _extract_text(response)
+    if key is not None:
+        llm_cache.put(key, text)
+    return text
+
+
+async def stream_gemini_api(prompt_text, generation_config=None):
+    """
+    Streaming variant of call_gemini_api: yields text chunks as Gemini
+    generates them (streamGenerateContent over SSE).
+    """
+    data = _build_request(prompt_text, generation_config)
+    async for event in gemini_client.async_stream(GEMINI_STREAM_URL, data):
+        for candidate in event.get("candidates", [])[:1]:
+            for part in candidate.get("content", {}).get("parts", []):
+                if part.get("text"):
+                    yield part["text"]
+
+
 def zero_shot_prompt(user_question):
     """
     Zero-shot prompting: Send only the user question.
@@ -88,6 +125,23 @@ def system_user_prompt(system_prompt, user_prompt, generation_config=None):
     return call_gemini_api(combined, generation_config=generation_config)
 
 
+async def system_user_prompt_async(system_prompt, user_prompt, generation_config=None):
+    """
+    Async variant of system_user_prompt.
+    """
+    combined = f"System instructions: {system_prompt}\nUser query: {user_prompt}"
+    return await call_gemini_api_async(combined, generation_config=generation_config)
+
+
+async def system_user_prompt_stream(system_prompt, user_prompt, generation_config=None):
+    """
+    Streaming variant of system_user_prompt.
+    """
+    combined = f"System instructions: {system_prompt}\nUser query: {user_prompt}"
+    async for chunk in stream_gemini_api(combined, generation_config=generation_config):
+        yield chunk
+
+
 if __name__ == "__main__":
     # Demo runs aligned with Project Use Cases and Architecture
 
@@ -2,11 +2,23 @@
 core/rag_engine.py
 ==================
 Retrieval Augmented Generation (RAG) orchestration for NextGenLingo.
+
+The *_async variants are for the FastAPI endpoints: Gemini calls go through
+the async HTTP client and vector store work runs in a worker thread, so the
+event loop is never blocked.
+
+query_with_rag answers without conversation history are served from
+response_cache.py when the same (or a near-identical) question was already
+answered over the current documents.
 """
 
+import asyncio
+
+import chunking
 import embeddings
 import vector_store
 import prompting
+import response_cache
 from dynamic_prompting import (
     build_summary_prompt,
     build_quiz_prompt,
@@ -14,68 +26,163 @@ from dynamic_prompting import (
     build_code_review_prompt,
     build_debate_prompt,
 )
-from dynamic_prompting import build_dynamic_prompt
+from dynamic_prompting import build_dynamic_prompt_with_report, format_context
 
 
 
 def add_document(text, doc_id=None, source=None):
     """
-    Add a new document text chunk to the vector store with embedding and metadata.
+    Split a document into token-aware chunks (see chunking.py) and add them
+    to the vector store with embeddings and metadata. A document that fits in
+    one chunk keeps doc_id; longer ones get "<doc_id>-<chunk number>".
+    Returns the number of chunks added.
+    """
+    chunks = chunking.chunk_text(text)
+    if len(chunks) == 1:
+        return add_documents(chunks, doc_ids=[doc_id], source=source)
+    prefix = doc_id or source
+    return add_documents(chunks, doc_ids=[f"{prefix}-{i}" for i in range(len(chunks))], source=source)
+
+
+def add_documents(texts, doc_ids=None, source=None):
     """
-    emb = embeddings.generate_embedding(text)
-    meta = {"id": doc_id, "source": source, "content": text}
-    vector_store.add_document_embedding(emb, meta)
+    Embed a list of text chunks and add them to the vector store as one batch.
+    doc_ids defaults to "<source>-<chunk number>". Chunks already in the store
+    are skipped without being embedded. Returns the number of chunks added.
+    """
+    if not texts:
+        return 0
+    if doc_ids is None:
+        doc_ids = [f"{source}-{i}" for i in range(len(texts))]
+
+    metas, _ = vector_store.filter_new_chunks(_chunk_metadata(texts, doc_ids, source))
+    added = 0
+    if metas:
+        embs = embeddings.generate_embeddings([meta["content"] for meta in metas])
+        added = vector_store.add_document_embeddings(embs, metas)
+    _report_skipped(source, len(texts) - added)
+    return added
+
+
+def _report_skipped(source, skipped):
+    if skipped:
+        print(f"Skipped {skipped} duplicate chunk(s) from {source}.")
+
+
+def _chunk_metadata(texts, doc_ids, source):
+    return [
+        {"id": doc_id, "source": source, "content": text}
+        for doc_id, text in zip(doc_ids, texts)
+    ]
 
 
 def build_context_from_results(results):
     """Format retrieved search results into a context block for prompting."""
-    context_parts = []
-    for res in results:
-        meta = res.get("metadata", {})
-        source_name = meta.get("source", "unknown source")
-        snippet = meta.get("content", "")
-        context_parts.append(f"[Source: {source_name}]\n{snippet}\n")
-    return "\n---\n".join(context_parts)
+    return format_context(results)
 
 
 def query_with_rag(user_query, conversation_history=None, top_k=3, output_format=None, intent="summary"):
+    # Answers without conversation history are reused from the response cache.
+    cacheable = not conversation_history
+    if cacheable:
+        cached = response_cache.lookup_exact(user_query, intent, output_format, top_k)
+        if cached is not None:
+            return cached
+    generation = vector_store.generation
+
     # Step 1: Embed the user query
     query_emb = embeddings.generate_embedding(user_query)
-    
+    if cacheable:
+        cached = response_cache.lookup_similar(query_emb, intent, output_format, top_k)
+        if cached is not None:
+            return cached
+
     # Step 2: Retrieve similar document chunks from vector store
     results = vector_store.search_similar(query_emb, top_k=top_k)
-    
-    # Step 3: Build retrieved context text from search results
-    retrieved_context = build_context_from_results(results)
-    
-    # Step 4: Use provided conversation history or empty list
+
+    # Steps 3-6: Build the prompt from retrieved context and history
+    system_prompt, prompt_text = build_rag_prompt(user_query, results, conversation_history, output_format, intent)
+
+    # Step 7: Send full prompt to your LLM interface
+    answer = prompting.system_user_prompt(system_prompt, prompt_text)
+    if cacheable:
+        response_cache.store(user_query, query_emb, intent, output_format, top_k, answer, generation)
+    return answer
+
+
+async def query_with_rag_async(user_query, conversation_history=None, top_k=3, output_format=None, intent="summary"):
+    """
+    Async variant of query_with_rag: one worker can keep many of these in flight.
+    """
+    cacheable = not conversation_history
+    if cacheable:
+        cached = response_cache.lookup_exact(user_query, intent, output_format, top_k)
+        if cached is not None:
+            return cached
+    generation = vector_store.generation
+
+    query_emb = await embeddings.generate_embedding_async(user_query)
+    if cacheable:
+        cached = response_cache.lookup_similar(query_emb, intent, output_format, top_k)
+        if cached is not None:
+            return cached
+
+    results = await asyncio.to_thread(vector_store.search_similar, query_emb, top_k)
+    system_prompt, prompt_text = await asyncio.to_thread(
+        build_rag_prompt, user_query, results, conversation_history, output_format, intent
+    )
+    answer = await prompting.system_user_prompt_async(system_prompt, prompt_text)
+    if cacheable:
+        response_cache.store(user_query, query_emb, intent, output_format, top_k, answer, generation)
+    return answer
+
+
+async def retrieve_async(user_query, top_k=3):
+    """Embeds the query and returns the top_k search results (steps 1-2 of query_with_rag)."""
+    query_emb = await embeddings.generate_embedding_async(user_query)
+    return await asyncio.to_thread(vector_store.search_similar, query_emb, top_k)
+
+
+def sources_from_results(results):
+    """Distinct source names of the search results, best match first."""
+    sources = [res.get("metadata", {}).get("source") for res in results]
+    return list(dict.fromkeys(source for source in sources if source))
+
+
+def build_rag_prompt(user_query, results, conversation_history=None, output_format=None, intent="summary"):
+    """
+    Returns (system_prompt, prompt_text) for a query and its retrieved results.
+    The prompt is kept within dynamic_prompting.PROMPT_TOKEN_BUDGET.
+    """
+    # Step 3: Use provided conversation history or empty list
     conversation = conversation_history if conversation_history else []
-    
-    # Step 5: Build prompt dynamically using mode/intent
-    prompt_text = build_dynamic_prompt(
+
+    # Steps 4-5: Build the prompt for the mode/intent, dropping the oldest turns
+    # and lowest-scoring chunks that do not fit the token budget
+    prompt_text, report = build_dynamic_prompt_with_report(
         user_query=user_query,
         conversation_history=conversation,
-        retrieved_context=retrieved_context,
+        retrieved_context=results,
         output_format=output_format,
         mode=intent
     )
+    if report["history_turns_dropped"] or report["chunks_dropped"] or report["chunks_truncated"]:
+        print(f"Prompt trimmed to ~{report['estimated_tokens']}/{report['token_budget']} tokens: "
+              f"dropped {report['history_turns_dropped']} turn(s) and {report['chunks_dropped']} chunk(s), "
+              f"truncated {report['chunks_truncated']} chunk(s).")
     
-    # Step 6: Compose system prompt and send full prompt to your LLM interface
+    # Step 6: Compose system prompt
     system_prompt = (
         "You are NextGenLingo, an intelligent AI assistant. "
         "Use the provided context to answer the user accurately with citations."
     )
-    answer = prompting.system_user_prompt(system_prompt, prompt_text)
-    return answer
+    return system_prompt, prompt_text
 
 
 
 if __name__ == "__main__":
     # TEMP: clear existing store for clean test
-    import os
-    for f in ["vector_store.index", "vector_store_meta.json"]:
-        if os.path.exists(f):
-            os.remove(f)
+    vector_store.clear_vector_store()
     # Add a sample doc
     sample_doc = "Paris is the capital city of France, known for the Eiffel Tower."
     add_document(sample_doc, doc_id="doc1", source="SampleDoc.txt")
@@ -0,0 +1,145 @@
+"""
+core/response_cache.py
+======================
+Semantic cache of RAG answers for NextGenLingo.
+
+Entries are grouped by (intent, output_format, top_k). A query that matches
+a cached one after whitespace/case normalization is answered without any
+embedding call; otherwise, once the query is embedded, the closest cached
+query in the group is reused if its cosine similarity is at least
+SIMILARITY_THRESHOLD.
+
+Every entry records the vector store generation it was answered from, and
+the whole cache is dropped as soon as the store changes (new chunks, a
+clear or a dedup), so answers never outlive the documents behind them.
+Entries expire after TTL_SECONDS and the least recently used are evicted
+past MAX_ENTRIES.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import vector_store
+
+ENABLED = os.getenv("RESPONSE_CACHE", "1") != "0"
+SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+# normalized query -> {"group", "embedding", "answer", "created"}, least recently used first
+_entries = OrderedDict()
+_generation = None
+_lock = threading.Lock()
+
+
+def normalize_query(query):
+    return " ".join(query.casefold().split())
+
+
+def _unit(embedding):
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _check_generation():
+    """Drops everything if the vector store changed since the entries were cached (call under _lock)."""
+    global _generation
+    if vector_store.generation != _generation:
+        if _entries:
+            stats["invalidations"] += 1
+            _entries.clear()
+        _generation = vector_store.generation
+
+
+def _live(key, entry):
+    """False (and the entry removed) if it has expired (call under _lock)."""
+    if time.time() - entry["created"] > TTL_SECONDS:
+        del _entries[key]
+        stats["expirations"] += 1
+        return False
+    return True
+
+
+def lookup_exact(query, intent, output_format, top_k):
+    """Cached answer for the same normalized query text, or None. Counts nothing on a miss."""
+    if not ENABLED:
+        return None
+    key = (normalize_query(query), intent, output_format, top_k)
+    with _lock:
+        _check_generation()
+        entry = _entries.get(key)
+        if entry is None or not _live(key, entry):
+            return None
+        _entries.move_to_end(key)
+        stats["exact_hits"] += 1
+        return entry["answer"]
+
+
+def lookup_similar(query_embedding, intent, output_format, top_k):
+    """Cached answer of the most similar query in the same group above the threshold, or None."""
+    if not ENABLED:
+        return None
+    group = (intent, output_format, top_k)
+    query = _unit(query_embedding)
+    with _lock:
+        _check_generation()
+        candidates = [
+            (key, entry) for key, entry in list(_entries.items())
+            if entry["group"] == group and _live(key, entry)
+        ]
+        if candidates:
+            similarities = np.stack([entry["embedding"] for _, entry in candidates]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] >= SIMILARITY_THRESHOLD:
+                key, entry = candidates[best]
+                _entries.move_to_end(key)
+                stats["semantic_hits"] += 1
+                return entry["answer"]
+        stats["misses"] += 1
+        return None
+
+
+def store(query, query_embedding, intent, output_format, top_k, answer, generation):
+    """
+    Caches an answer. `generation` is vector_store.generation read before
+    retrieval; if the store has changed since, the answer is not cached.
+    """
+    if not ENABLED:
+        return
+    key = (normalize_query(query), intent, output_format, top_k)
+    with _lock:
+        _check_generation()
+        if generation != _generation:
+            return
+        _entries[key] = {
+            "group": (intent, output_format, top_k),
+            "embedding": _unit(query_embedding),
+            "answer": answer,
+            "created": time.time(),
+        }
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+            stats["evictions"] += 1
+
+
+def cache_stats():
+    """Hit/miss counters, hit rate and current size."""
+    hits = stats["exact_hits"] + stats["semantic_hits"]
+    total = hits + stats["misses"]
+    return {**stats, "hit_rate": hits / total if total else 0.0, "entries": len(_entries)}
+
+
+def clear():
+    """Empties the cache and resets the counters."""
+    with _lock:
+        _entries.clear()
+        for name in stats:
+            stats[name] = 0
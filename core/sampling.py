@@ -11,13 +11,11 @@ Controls included:
 These functions can be called directly, or integrated within prompt workflows.
 """
 
-import os
-import requests
-from dotenv import load_dotenv
+import gemini_client
+import llm_cache
+import settings
 
-# Load API Key
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_KEY = settings.GEMINI_API_KEY
 
 # Gemini API base URL
 GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
@@ -29,11 +27,11 @@ GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0
 def call_gemini_with_config(prompt, generation_config):
     """
     Calls the Gemini API with a given prompt and specified generation config.
+    Deterministic configs are served from llm_cache.py when it is enabled.
     """
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": GEMINI_API_KEY
-    }
+    key = llm_cache.cache_key(GEMINI_URL, prompt, generation_config)
+    if key is not None and (cached := llm_cache.get(key)) is not None:
+        return cached
 
     data = {
         "generationConfig": generation_config,
@@ -46,13 +44,16 @@ def call_gemini_with_config(prompt, generation_config):
         ]
     }
 
-    response = requests.post(GEMINI_URL, headers=headers, json=data)
+    response = gemini_client.post(GEMINI_URL, data)
     response_json = response.json()
 
     if response.status_code != 200:
         raise Exception(f"API call failed: {response_json}")
 
-    return response_json["candidates"][0]["content"]["parts"][0]["text"]
+    text = response_json["candidates"][0]["content"]["parts"][0]["text"]
+    if key is not None:
+        llm_cache.put(key, text)
+    return text
 
 
 # ------------------------
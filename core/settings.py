@@ -0,0 +1,49 @@
+"""
+core/settings.py
+================
+Process-wide configuration for NextGenLingo.
+
+`.env` is loaded exactly once, when this module is first imported; modules
+read shared values (such as the Gemini API key) from here instead of each
+calling load_dotenv. Module-specific settings stay next to their code as
+os.getenv reads, so entry points (api.py, CLIs) import this module first to
+have .env applied before those are read.
+
+`lazy_import` returns a module that is only really imported on first
+attribute access, for heavy dependencies (faiss, httpx, ...) that most
+code paths never touch, so they stay out of API startup. The first access
+goes through the normal import machinery, so threads that touch the module
+at the same time all wait for the one complete import.
+"""
+
+import os
+import sys
+import types
+import importlib
+import importlib.util
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __getattr__(self, attr):
+        module = self.__dict__.get("_module")
+        if module is None:
+            # importlib's per-module lock makes concurrent first accesses wait for one import.
+            module = self.__dict__["_module"] = importlib.import_module(self.__name__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """The module `name`, imported on first attribute access (or the real one if already imported)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named '{name}'")
+    return _LazyModule(name)
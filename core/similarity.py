@@ -4,6 +4,14 @@ core/similarity.py
 Similarity calculations for NextGenLingo RAG:
 - Cosine Similarity
 - Euclidean (L2) Distance
+- Dot Product
+
+The pairwise functions compare two vectors. The *_batch functions score one
+query against every row of a matrix and the *_matrix functions score every
+row of one matrix against every row of another, in single BLAS calls on
+float32 data (float32 inputs are used as-is, not copied). Pass
+normalized=True when rows are already unit length to skip the norms.
+`top_k` picks the best k scores with argpartition instead of a full sort.
 
 Uses Gemini API to embed texts and compares embeddings.
 """
@@ -14,8 +22,8 @@ from embeddings import generate_embedding  # Adjust import based on your project
 
 def cosine_similarity(vec_a, vec_b):
     """Cosine similarity between two 1D vectors."""
-    a = np.array(vec_a)
-    b = np.array(vec_b)
+    a = np.asarray(vec_a)
+    b = np.asarray(vec_b)
     dot = np.dot(a, b)
     norm_a = np.linalg.norm(a)
     norm_b = np.linalg.norm(b)
@@ -29,19 +37,126 @@ def l2_distance(vec_a, vec_b):
     Calculate Euclidean (L2) distance between two vectors.
     Lower distance means higher similarity.
     """
-    a = np.array(vec_a)
-    b = np.array(vec_b)
+    a = np.asarray(vec_a)
+    b = np.asarray(vec_b)
     return np.linalg.norm(a - b)
 
+
 def dot_product_similarity(vec_a, vec_b):
     """
     Compute the dot product between two vectors.
     Higher value means more similar.
     """
-    a = np.array(vec_a)
-    b = np.array(vec_b)
+    a = np.asarray(vec_a)
+    b = np.asarray(vec_b)
     return np.dot(a, b)
 
+
+def as_float32(vectors):
+    """vectors as a float32 array; float32 arrays are returned without a copy."""
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def row_norms(matrix):
+    """L2 norm of every row of a 2D array (or of a 1D vector), without a temporary copy."""
+    matrix = as_float32(matrix)
+    if matrix.ndim == 1:
+        return np.sqrt(np.dot(matrix, matrix))
+    return np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+
+
+def normalize_rows(matrix, inplace=False):
+    """
+    Scales every row to unit length (zero rows stay zero). With inplace=True
+    a float32 input is overwritten instead of copied.
+    """
+    matrix = as_float32(matrix)
+    norms = row_norms(matrix)
+    norms = np.where(norms == 0, 1.0, norms).astype(np.float32)
+    scale = norms[:, None] if matrix.ndim == 2 else norms
+    if inplace:
+        matrix /= scale
+        return matrix
+    return matrix / scale
+
+
+def dot_product_batch(query, matrix):
+    """Dot product of one query vector with every row of matrix, shape (n,)."""
+    return as_float32(matrix) @ as_float32(query)
+
+
+def dot_product_matrix(queries, matrix):
+    """Dot products of every query row with every matrix row, shape (m, n)."""
+    return as_float32(queries) @ as_float32(matrix).T
+
+
+def cosine_similarity_batch(query, matrix, normalized=False):
+    """
+    Cosine similarity of one query vector with every row of matrix, shape (n,).
+    Rows with zero norm score 0.
+    """
+    scores = dot_product_batch(query, matrix)
+    if normalized:
+        return scores
+    norms = row_norms(matrix) * row_norms(query)
+    return np.divide(scores, norms, out=np.zeros_like(scores), where=norms != 0)
+
+
+def cosine_similarity_matrix(queries, matrix, normalized=False):
+    """Cosine similarity of every query row with every matrix row, shape (m, n)."""
+    scores = dot_product_matrix(queries, matrix)
+    if normalized:
+        return scores
+    norms = np.outer(row_norms(queries), row_norms(matrix))
+    return np.divide(scores, norms, out=np.zeros_like(scores), where=norms != 0)
+
+
+def l2_distance_batch(query, matrix, matrix_sq_norms=None):
+    """
+    Euclidean distance from one query vector to every row of matrix, shape (n,),
+    via |a|^2 + |b|^2 - 2ab. Pass matrix_sq_norms to reuse squared row norms
+    across queries.
+    """
+    query = as_float32(query)
+    if matrix_sq_norms is None:
+        matrix_sq_norms = row_norms(matrix) ** 2
+    squared = matrix_sq_norms + np.dot(query, query) - 2 * dot_product_batch(query, matrix)
+    return np.sqrt(np.maximum(squared, 0, out=squared), out=squared)
+
+
+def l2_distance_matrix(queries, matrix, matrix_sq_norms=None):
+    """Euclidean distance from every query row to every matrix row, shape (m, n)."""
+    if matrix_sq_norms is None:
+        matrix_sq_norms = row_norms(matrix) ** 2
+    squared = dot_product_matrix(queries, matrix)
+    squared *= -2
+    squared += row_norms(queries)[:, None] ** 2
+    squared += matrix_sq_norms[None, :]
+    return np.sqrt(np.maximum(squared, 0, out=squared), out=squared)
+
+
+def top_k(scores, k, largest=True):
+    """
+    Indices and values of the k best scores along the last axis, best first
+    (highest, or lowest with largest=False for distances). Works on (n,) and
+    (m, n) score arrays; only the k winners are sorted.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+        return empty, scores[..., :0]
+    keyed = -scores if largest else scores
+    if k < n:
+        part = np.argpartition(keyed, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    order = np.argsort(np.take_along_axis(keyed, part, axis=-1), axis=-1, kind="stable")
+    indices = np.take_along_axis(part, order, axis=-1)
+    return indices, np.take_along_axis(scores, indices, axis=-1)
+
+
 if __name__ == "__main__":
     # Sample texts
     query = "What is the capital of France?"
@@ -1,10 +1,7 @@
-import os
-import requests
-from dotenv import load_dotenv
+import gemini_client
+import settings
 
-# Load API Key
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_KEY = settings.GEMINI_API_KEY
 
 GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
 
@@ -15,11 +12,6 @@ def generate_with_stop_sequence(prompt, stop_sequences):
     :param prompt: The text prompt for the LLM.
     :param stop_sequences: List of strings where generation will stop.
     """
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": GEMINI_API_KEY
-    }
-
     data = {
         "generationConfig": {
             "stopSequences": stop_sequences
@@ -33,7 +25,7 @@ def generate_with_stop_sequence(prompt, stop_sequences):
         ]
     }
 
-    response = requests.post(GEMINI_URL, headers=headers, json=data)
+    response = gemini_client.post(GEMINI_URL, data)
     response_json = response.json()
 
     if response.status_code != 200:
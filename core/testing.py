@@ -1,3 +1,6 @@
+import os
+
+import llm_cache
 from prompting import zero_shot_prompt
 
 EVAL_DATASET = [
@@ -32,6 +35,8 @@ def evaluate():
     return results
 
 if __name__ == "__main__":
+    # Eval prompts are fixed, so re-runs are answered from the on-disk LLM cache.
+    llm_cache.enable(os.getenv("LLM_CACHE_FILE") or "llm_cache.db")
     results = evaluate()
     for r in results:
         print(f"Q: {r['question']}")
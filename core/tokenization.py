@@ -1,15 +1,153 @@
-from transformers import AutoTokenizer
+"""
+core/tokenization.py
+====================
+Token counting and offsets for NextGenLingo (chunking, prompt budgets).
+
+The tokenizer (TOKENIZER_NAME, GPT-2 by default) is loaded on first use,
+not at import, so importing this module costs nothing until text is
+actually tokenized. Counts are kept in an LRU of COUNT_CACHE_SIZE strings,
+and `count_tokens_batch` sends all uncached strings through the fast
+tokenizer's batch path in one call.
+
+With TOKEN_COUNTER=gemini, counts come from Gemini's countTokens endpoint
+instead, so budgets match what the API bills. countTokens returns one total
+per request, so each uncached string is its own call; up to
+GEMINI_COUNT_CONCURRENCY of them run at once. Offsets always come from the
+local tokenizer. All of this blocks, so async code calls it in a thread.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+TOKENIZER_NAME = os.getenv("TOKENIZER_NAME", "gpt2")
+TOKEN_COUNTER = os.getenv("TOKEN_COUNTER", "local")  # "local" or "gemini"
+COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "16384"))
+GEMINI_COUNT_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:countTokens"
+GEMINI_COUNT_CONCURRENCY = int(os.getenv("TOKEN_COUNT_GEMINI_CONCURRENCY", "8"))
+
+_tokenizer = None
+_load_lock = threading.Lock()
+_counts = OrderedDict()  # (counter, text) -> token count, least recently used first
+_counts_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """The shared fast tokenizer, loaded (with transformers) on first call."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _load_lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+    return _tokenizer
+
+
+def __getattr__(name):
+    # `tokenization.tokenizer` still works for callers from before lazy loading.
+    if name == "tokenizer":
+        return get_tokenizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Load GPT-2 tokenizer (commonly used)
-tokenizer = AutoTokenizer.from_pretrained("gpt2")
 
 def get_tokens(text):
     """Return list of tokens for the input text."""
-    return tokenizer.tokenize(text)
+    return get_tokenizer().tokenize(text)
+
+# Long texts are tokenized in segments of about this many characters: one
+# huge string is several times slower than a batch of small ones, and a
+# batch is spread across cores by the Rust tokenizer.
+SEGMENT_CHARS = 8192
+_SEGMENT_CUT = re.compile(r" (?=\S)")  # before a word's leading space, where GPT-2 splits anyway
+
+def _segment_starts(text):
+    starts = [0]
+    while len(text) - starts[-1] > SEGMENT_CHARS:
+        match = _SEGMENT_CUT.search(text, starts[-1] + SEGMENT_CHARS)
+        if match is None:
+            break
+        starts.append(match.start())
+    return starts
+
+def _segments(texts):
+    """Splits texts into tokenizer-sized segments; returns (segments, [(text index, char shift)])."""
+    segments, owners = [], []
+    for n, text in enumerate(texts):
+        starts = _segment_starts(text)
+        for start, end in zip(starts, starts[1:] + [len(text)]):
+            segments.append(text[start:end])
+            owners.append((n, start))
+    return segments, owners
+
+def _local_counts(texts):
+    segments, owners = _segments(texts)
+    encoded = get_tokenizer()(
+        segments,
+        add_special_tokens=False,
+        return_attention_mask=False,
+        verbose=False,  # segments may exceed the model's length limit; we only count
+    )
+    counts = [0] * len(texts)
+    for (n, _), ids in zip(owners, encoded["input_ids"]):
+        counts[n] += len(ids)
+    return counts
+
+def _gemini_count(text):
+    import gemini_client
+    response = gemini_client.post(GEMINI_COUNT_URL, {"contents": [{"parts": [{"text": text}]}]})
+    if response.status_code != 200:
+        raise Exception(f"Gemini countTokens failed: {response.status_code} {response.text}")
+    return response.json().get("totalTokens", 0)
+
+def _gemini_counts(texts):
+    if len(texts) == 1:
+        return [_gemini_count(texts[0])]
+    with ThreadPoolExecutor(max_workers=min(GEMINI_COUNT_CONCURRENCY, len(texts))) as pool:
+        return list(pool.map(_gemini_count, texts))
+
+def count_tokens_batch(texts):
+    """Token counts of several texts; uncached ones are counted in one batch and cached."""
+    keys = [(TOKEN_COUNTER, text) for text in texts]
+    counts = {}
+    with _counts_lock:
+        for key in keys:
+            if key in _counts:
+                _counts.move_to_end(key)
+                counts[key] = _counts[key]
+    missing = list(dict.fromkeys(key[1] for key in keys if key not in counts))
+    if missing:
+        fresh = _gemini_counts(missing) if TOKEN_COUNTER == "gemini" else _local_counts(missing)
+        with _counts_lock:
+            for text, count in zip(missing, fresh):
+                key = (TOKEN_COUNTER, text)
+                counts[key] = _counts[key] = count
+            while len(_counts) > COUNT_CACHE_SIZE:
+                _counts.popitem(last=False)
+    return [counts[key] for key in keys]
 
 def count_tokens(text):
-    """Return number of tokens for the input text."""
-    return len(tokenizer.encode(text))
+    """Return number of tokens for the input text (cached)."""
+    return count_tokens_batch([text])[0]
+
+def token_offsets_batch(texts):
+    """Return the (start, end) character offsets of every token, for each text, in one batched call."""
+    segments, owners = _segments(texts)
+    encoded = get_tokenizer()(
+        segments,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        verbose=False,  # segments may exceed GPT-2's 1024-token model limit; we only need offsets
+    )
+    offsets = [[] for _ in texts]
+    for (n, shift), spans in zip(owners, encoded["offset_mapping"]):
+        if shift:
+            offsets[n].extend((start + shift, end + shift) for start, end in spans)
+        else:
+            offsets[n].extend(spans)
+    return offsets
 
 if __name__ == "__main__":
     sample_text = "Python is a programming language and html is a markup language"
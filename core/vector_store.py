@@ -3,90 +3,730 @@ core/vector_store.py
 ====================
 Local FAISS vector store integration for NextGenLingo.
 Auto-detects embedding dimensions to avoid FAISS mismatches.
+
+Persistence is append-only by default: every add is written to a small
+write-ahead log (WAL) and the full index snapshot is only rewritten when the
+log is compacted, so each add costs O(1) bytes on disk. Chunk metadata lives
+in SQLite (see metadata_store.py), keyed by vector id.
+
+The distance metric is "cosine" (vectors are L2-normalized on insert and at
+query time and indexed by inner product, so search scores are cosine
+similarities) or "l2" (raw vectors, squared Euclidean distance). New stores
+use VECTOR_STORE_METRIC; the metric is recorded in the metadata database and
+an existing store always loads with the metric it was built with. Convert a
+store with:
+    python vector_store.py set-metric cosine
+
+New stores start on an exact flat index. Once the store holds PROMOTE_AT
+vectors it is rebuilt in the background as the approximate index named by
+INDEX_TYPE (HNSW or IVF-Flat), whose recall/latency trade-off is tuned with
+HNSW_EF_SEARCH / IVF_NPROBE.
+
+Adds skip chunks whose normalized content is already stored (and, when
+DEDUP_NEAR_DISTANCE is set, chunks whose embedding is that close to a stored
+one). `filter_new_chunks` applies the exact check before embedding, so
+callers don't pay for embeddings that would be dropped. Existing stores are
+cleaned up with:
+    python vector_store.py dedup [--near-distance D]
+
+Nothing is read (and faiss is not even imported) at import time: the store
+loads on first use or on `warm_up()`, and the FAISS
+index is opened memory-mapped read-only (where the index type allows) so
+uvicorn workers share the OS page cache instead of each holding a copy.
 """
 
 import os
 import json
-import faiss
+import shutil
+import argparse
+import base64
+import math
+import time
+import threading
+from contextlib import nullcontext
+
 import numpy as np
 
+import metadata_store
+import settings
+
+# faiss is imported when the store is first touched, not when this module is.
+faiss = settings.lazy_import("faiss")
+
 VECTOR_STORE_INDEX_FILE = "vector_store.index"
+VECTOR_STORE_META_DB = "vector_store_meta.db"
+VECTOR_STORE_WAL_FILE = "vector_store.wal"
+# Legacy JSON metadata list; migrated into VECTOR_STORE_META_DB on first load.
 VECTOR_STORE_META_FILE = "vector_store_meta.json"
 
+# "wal" appends each add to the write-ahead log and compacts it into the
+# snapshot files every COMPACT_EVERY records; "snapshot" rewrites the full
+# snapshot after every add (the original behaviour).
+PERSISTENCE_MODE = os.getenv("VECTOR_STORE_PERSISTENCE", "wal")
+COMPACT_EVERY = int(os.getenv("VECTOR_STORE_COMPACT_EVERY", "1000"))
+WAL_FSYNC = os.getenv("VECTOR_STORE_WAL_FSYNC", "1") != "0"
+
+# Index type the flat index is promoted to: "hnsw", "ivf" or "flat" (never promote).
+INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+PROMOTE_AT = int(os.getenv("VECTOR_INDEX_PROMOTE_AT", "100000"))
+HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("VECTOR_INDEX_HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("VECTOR_INDEX_IVF_NLIST", "0"))  # 0 = derive from corpus size
+IVF_NPROBE = int(os.getenv("VECTOR_INDEX_IVF_NPROBE", "16"))
+
+# Metric for new stores: "cosine" or "l2". Existing stores keep the metric they were built with.
+DEFAULT_METRIC = os.getenv("VECTOR_STORE_METRIC", "cosine")
+METRICS = ("cosine", "l2")
+
+DEDUP = os.getenv("VECTOR_STORE_DEDUP", "1") != "0"
+# Squared L2 distance under which a new vector counts as a near-duplicate; 0 = exact matches only.
+# For cosine stores this is between unit vectors, i.e. 2 - 2 * cosine similarity.
+DEDUP_NEAR_DISTANCE = float(os.getenv("VECTOR_STORE_DEDUP_NEAR_DISTANCE", "0"))
+
+MMAP_INDEX = os.getenv("VECTOR_STORE_MMAP", "1") != "0"
+
 index = None
-metadata = []
 EMBEDDING_DIM = None  # Will be set dynamically
+metric = DEFAULT_METRIC  # metric of the live store; read from the metadata database on load
+
+_lock = threading.RLock()
+_compaction_lock = threading.Lock()
+_compaction_thread = None
+_promotion_thread = None
+_wal_records = 0
+_loaded = False
+_index_mmapped = False
+load_seconds = None
+generation = 0  # bumped whenever the stored chunks change; lets caches detect stale answers
+dedup_stats = {"exact": 0, "near": 0}
+
+
+def _faiss_metric(name):
+    if name not in METRICS:
+        raise ValueError(f"Unknown metric '{name}'. Use 'cosine' or 'l2'.")
+    return faiss.METRIC_INNER_PRODUCT if name == "cosine" else faiss.METRIC_L2
+
+
+def _index_metric(source):
+    """Metric name matching a FAISS index's metric type."""
+    return "cosine" if source.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+
+def normalize_vectors(vectors):
+    """Float32 copy of `vectors` with every row scaled to unit length (zero rows stay zero)."""
+    vectors = np.array(vectors, dtype="float32", order="C", ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _prepare(vectors):
+    """Vectors as stored/queried under the live metric: normalized for cosine, as-is for l2."""
+    if metric == "cosine":
+        return normalize_vectors(vectors)
+    return np.ascontiguousarray(vectors, dtype="float32")
 
 
 def init_index(dimension: int):
-    """Initializes the FAISS index with the given dimension."""
+    """Initializes an empty flat FAISS index with the given dimension for the live metric."""
     global index, EMBEDDING_DIM
     EMBEDDING_DIM = dimension
-    index = faiss.IndexFlatL2(dimension)
+    index = faiss.IndexFlat(dimension, _faiss_metric(metric))
 
 
-def load_vector_store():
-    global index, metadata, EMBEDDING_DIM
-    if os.path.exists(VECTOR_STORE_INDEX_FILE):
-        index = faiss.read_index(VECTOR_STORE_INDEX_FILE)
-        EMBEDDING_DIM = index.d
-    if os.path.exists(VECTOR_STORE_META_FILE):
+def build_index(index_type, vectors, metric_name=None):
+    """
+    Builds (and trains, for IVF) a new FAISS index of the given type
+    ("flat", "hnsw" or "ivf") containing `vectors`, in order. The metric
+    defaults to the live store's; vectors for a cosine index must already
+    be normalized.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dimension = vectors.shape
+    faiss_metric = _faiss_metric(metric_name or metric)
+
+    if index_type == "flat":
+        new_index = faiss.IndexFlat(dimension, faiss_metric)
+    elif index_type == "hnsw":
+        new_index = faiss.index_factory(dimension, f"HNSW{HNSW_M},Flat", faiss_metric)
+        new_index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "ivf":
+        # ~4*sqrt(n) lists, but keep >= 39 training points per list as FAISS expects.
+        nlist = IVF_NLIST or max(1, min(int(4 * math.sqrt(n)), n // 39))
+        new_index = faiss.index_factory(dimension, f"IVF{nlist},Flat", faiss_metric)
+        sample_size = min(n, nlist * 256)
+        sample = vectors[np.random.default_rng(0).choice(n, sample_size, replace=False)]
+        new_index.train(sample)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'. Use 'flat', 'hnsw' or 'ivf'.")
+
+    new_index.add(vectors)
+    set_search_params(target=new_index)
+    return new_index
+
+
+def set_search_params(ef_search=None, nprobe=None, target=None):
+    """
+    Sets the recall/latency knobs of an approximate index (efSearch for HNSW,
+    nprobe for IVF); no-op for a flat index. Without `target` the values
+    become the module defaults and are applied to the live index.
+    """
+    global HNSW_EF_SEARCH, IVF_NPROBE
+    if target is None:
+        HNSW_EF_SEARCH = ef_search if ef_search is not None else HNSW_EF_SEARCH
+        IVF_NPROBE = nprobe if nprobe is not None else IVF_NPROBE
+        target = index
+        if target is None:
+            return
+
+    params = faiss.ParameterSpace()
+    if isinstance(target, faiss.IndexHNSW):
+        params.set_index_parameter(target, "efSearch", ef_search if ef_search is not None else HNSW_EF_SEARCH)
+    elif isinstance(target, faiss.IndexIVF):
+        params.set_index_parameter(target, "nprobe", nprobe if nprobe is not None else IVF_NPROBE)
+
+
+def _reconstruct(source, start, count):
+    """Returns vectors [start, start + count) of any index type as a float32 matrix."""
+    if isinstance(source, faiss.IndexIVF):
+        source.make_direct_map()
+    return source.reconstruct_n(start, count)
+
+
+def promote_index(index_type=None):
+    """
+    Rebuilds the live index as `index_type` (default INDEX_TYPE).
+    The build/train step runs without holding the store lock, so searches
+    and adds keep using the old index; vectors added meanwhile are copied
+    across just before the swap. Returns True if the index was replaced.
+    """
+    global index, _index_mmapped
+    index_type = index_type or INDEX_TYPE
+    _ensure_loaded()
+
+    with _lock:
+        source = index
+        if source is None or source.ntotal == 0:
+            return False
+        built_upto = source.ntotal
+        vectors = _reconstruct(source, 0, built_upto)
+
+    new_index = build_index(index_type, vectors)
+
+    with _lock:
+        if index is not source:
+            # Store was cleared or replaced while we were building.
+            return False
+        if index.ntotal > built_upto:
+            new_index.add(_reconstruct(index, built_upto, index.ntotal - built_upto))
+        index = new_index
+        _index_mmapped = False
+
+    print(f"Promoted vector index to '{index_type}' at {index.ntotal} vectors.")
+    _schedule_compaction()
+    return True
+
+
+def _maybe_promote():
+    """Starts a background promotion once a flat index reaches PROMOTE_AT vectors."""
+    global _promotion_thread
+    if INDEX_TYPE == "flat" or not isinstance(index, faiss.IndexFlat) or index.ntotal < PROMOTE_AT:
+        return
+    if _promotion_thread is not None and _promotion_thread.is_alive():
+        return
+    _promotion_thread = threading.Thread(target=promote_index, daemon=True)
+    _promotion_thread.start()
+
+
+def _read_index(path):
+    """Opens the index memory-mapped when the index type allows; returns (index, mmapped)."""
+    if MMAP_INDEX:
         try:
-            with open(VECTOR_STORE_META_FILE, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warning: {VECTOR_STORE_META_FILE} is empty or corrupted, resetting metadata.")
-            metadata = []
-            # Optionally remove the file
-            os.remove(VECTOR_STORE_META_FILE)
+            # IO_FLAG_MMAP_IFC maps flat codes too; older FAISS builds only have IO_FLAG_MMAP.
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            return faiss.read_index(path, flags), True
+        except RuntimeError:
+            pass  # Not mappable; fall back to reading it into RAM.
+    return faiss.read_index(path), False
+
+
+def _ensure_writable():
+    """
+    Swaps a memory-mapped index for an in-RAM copy before its first mutation
+    (FAISS aborts when adding to mapped storage). The mapped index is never
+    modified, so re-reading the file yields the same contents.
+    """
+    global index, _index_mmapped
+    if _index_mmapped:
+        index = faiss.read_index(VECTOR_STORE_INDEX_FILE)
+        set_search_params()
+        _index_mmapped = False
+
+
+def load_vector_store():
+    """Loads the snapshot files, then replays any WAL records not yet compacted."""
+    global index, EMBEDDING_DIM, _wal_records, _loaded, _index_mmapped, load_seconds, metric
+    with _lock:
+        start = time.perf_counter()
+        if os.path.exists(VECTOR_STORE_INDEX_FILE):
+            index, _index_mmapped = _read_index(VECTOR_STORE_INDEX_FILE)
+            EMBEDDING_DIM = index.d
+            set_search_params()
+        if not os.path.exists(VECTOR_STORE_META_DB) and os.path.exists(VECTOR_STORE_META_FILE):
+            migrated = metadata_store.migrate_from_json(VECTOR_STORE_META_FILE, VECTOR_STORE_META_DB)
+            # Keep the JSON around for reference, but never migrate it twice.
+            os.replace(VECTOR_STORE_META_FILE, VECTOR_STORE_META_FILE + ".migrated")
+            print(f"Migrated {migrated} metadata rows from {VECTOR_STORE_META_FILE} to {VECTOR_STORE_META_DB}.")
+        metadata_store.open_store(VECTOR_STORE_META_DB)
+
+        stored_metric = metadata_store.get_setting("metric")
+        if index is not None:
+            if stored_metric is not None and stored_metric != _index_metric(index):
+                raise ValueError(f"{VECTOR_STORE_INDEX_FILE} uses the '{_index_metric(index)}' metric "
+                                 f"but the metadata database records '{stored_metric}'.")
+            # Stores from before the metric was recorded are whatever their index is.
+            stored_metric = _index_metric(index)
+        metric = stored_metric or DEFAULT_METRIC
+        _faiss_metric(metric)
+        metadata_store.set_setting("metric", metric)
+
+        _wal_records = 0
+        replayed = _replay_wal()
+        if replayed:
+            print(f"Replayed {replayed} record(s) from {VECTOR_STORE_WAL_FILE}.")
+        # Rows committed for vectors that never reached the WAL (crash in between).
+        metadata_store.delete_from(index.ntotal if index is not None else 0)
+        _loaded = True
+        load_seconds = time.perf_counter() - start
+
+    print(f"Loaded vector store: {index.ntotal if index is not None else 0} vectors"
+          f"{' (memory-mapped)' if _index_mmapped else ''} in {load_seconds * 1000:.1f} ms.")
+    if _wal_records >= COMPACT_EVERY:
+        _schedule_compaction()
+    _maybe_promote()
+
+
+def _ensure_loaded():
+    """Loads the store on first use."""
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                load_vector_store()
+
+
+def warm_up():
+    """Loads the store now (e.g. in the background at startup) instead of on first use."""
+    _ensure_loaded()
 
 
+def load_stats():
+    """Load state of the store, for diagnostics and readiness checks."""
+    return {
+        "loaded": _loaded,
+        "load_seconds": load_seconds,
+        "memory_mapped": _index_mmapped,
+        "vectors": index.ntotal if index is not None else 0,
+        "metric": metric,
+    }
+
+
+def _encode_wal_record(vector_id, vector_row):
+    """Serializes one vector as a single JSON line (stored as base64 float32)."""
+    return json.dumps({
+        "id": vector_id,
+        "vector": base64.b64encode(vector_row.tobytes()).decode("ascii"),
+    }) + "\n"
+
+
+def _append_wal(lines):
+    """Appends records to the WAL; returns once they are durable on disk."""
+    global _wal_records
+    with open(VECTOR_STORE_WAL_FILE, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+        if WAL_FSYNC:
+            os.fsync(f.fileno())
+    _wal_records += len(lines)
+
+
+def _replay_wal():
+    """Re-applies WAL records whose ids are not covered by the loaded snapshot."""
+    global _wal_records
+    if not os.path.exists(VECTOR_STORE_WAL_FILE):
+        return 0
+
+    replayed = 0
+    with open(VECTOR_STORE_WAL_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn trailing line means the process died mid-write, before
+                # that add was acknowledged, so it is safe to drop.
+                print(f"Warning: ignoring truncated record at end of {VECTOR_STORE_WAL_FILE}.")
+                break
+
+            vec_np = np.frombuffer(base64.b64decode(record["vector"]), dtype="float32").reshape(1, -1)
+            if index is None:
+                init_index(vec_np.shape[1])
+
+            if record["id"] == index.ntotal:
+                _ensure_writable()
+                index.add(vec_np)
+                replayed += 1
+                if "metadata" in record:
+                    # Records written before metadata moved to SQLite carry it inline.
+                    metadata_store.put_many(record["id"], [record["metadata"]])
+            _wal_records += 1
+    return replayed
+
+
+def _write_file_atomic(path, data):
+    """Writes bytes to path via a temp file + rename so readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _truncate_wal(covered):
+    """Drops WAL records with ids below `covered`, keeping any appended since."""
+    if not os.path.exists(VECTOR_STORE_WAL_FILE):
+        return 0
+    with open(VECTOR_STORE_WAL_FILE, "r", encoding="utf-8") as f:
+        remaining = []
+        for line in f:
+            try:
+                if json.loads(line)["id"] >= covered:
+                    remaining.append(line)
+            except json.JSONDecodeError:
+                break
+    _write_file_atomic(VECTOR_STORE_WAL_FILE, "".join(remaining).encode("utf-8"))
+    return len(remaining)
+
+
+def compact_vector_store():
+    """
+    Folds the WAL into the snapshot files and truncates it.
+    Adds may continue while the snapshot is being written; their records stay
+    in the WAL and are picked up by the next compaction.
+    """
+    global _wal_records
+    with _compaction_lock:
+        with _lock:
+            if not _loaded or index is None:
+                return
+            index_bytes = faiss.serialize_index(index).tobytes()
+            covered = index.ntotal
+
+        _write_file_atomic(VECTOR_STORE_INDEX_FILE, index_bytes)
+
+        with _lock:
+            _wal_records = _truncate_wal(covered)
+
+
+def _write_snapshot():
+    """Writes the full index snapshot and drops the WAL records it covers (call holding _compaction_lock and _lock)."""
+    global _wal_records
+    _write_file_atomic(VECTOR_STORE_INDEX_FILE, faiss.serialize_index(index).tobytes())
+    _wal_records = _truncate_wal(index.ntotal)
+
+
+def _schedule_compaction():
+    """Starts a background compaction unless one is already running."""
+    global _compaction_thread
+    if _compaction_thread is not None and _compaction_thread.is_alive():
+        return
+    _compaction_thread = threading.Thread(target=compact_vector_store, daemon=True)
+    _compaction_thread.start()
+
 
 def save_vector_store():
-    """Saves FAISS index and metadata to disk."""
-    faiss.write_index(index, VECTOR_STORE_INDEX_FILE)
-    with open(VECTOR_STORE_META_FILE, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    """Saves the FAISS index to disk (a synchronous compaction); metadata is already in SQLite."""
+    compact_vector_store()
+
+
+def filter_new_chunks(metadata_items):
+    """
+    Drops items whose content is already stored or repeats an earlier item.
+    Returns (kept items, number skipped). Call before embedding; the add
+    itself re-checks under the store lock.
+    """
+    if not DEDUP:
+        return list(metadata_items), 0
+    _ensure_loaded()
+    hashes = [metadata_store.content_hash(item.get("content")) for item in metadata_items]
+    seen = metadata_store.existing_hashes(hashes)
+    kept = []
+    for item, h in zip(metadata_items, hashes):
+        if h is None or h not in seen:
+            kept.append(item)
+            if h is not None:
+                seen.add(h)
+    return kept, len(metadata_items) - len(kept)
+
+
+def _new_rows(vec_np, metadata_items):
+    """Boolean mask of the rows that are neither exact nor near duplicates (call under _lock)."""
+    hashes = [metadata_store.content_hash(item.get("content")) for item in metadata_items]
+    seen = metadata_store.existing_hashes(hashes)
+    keep = np.ones(len(hashes), dtype=bool)
+    for i, h in enumerate(hashes):
+        if h is not None:
+            keep[i] = h not in seen
+            seen.add(h)
+    dedup_stats["exact"] += int((~keep).sum())
+
+    if DEDUP_NEAR_DISTANCE > 0 and index is not None and index.ntotal > 0 and keep.any():
+        rows = np.flatnonzero(keep)
+        distances, _ = index.search(vec_np[rows], 1)
+        if metric == "cosine":
+            distances = 2 - 2 * distances  # squared L2 between unit vectors
+        near = rows[distances[:, 0] <= DEDUP_NEAR_DISTANCE]
+        keep[near] = False
+        dedup_stats["near"] += len(near)
+    return keep
+
+
+def add_document_embeddings(vectors, metadata_items):
+    """
+    Adds a batch of embeddings and their metadata to the store.
+    `vectors` is an (n, d) float32 matrix (or anything NumPy can stack into
+    one); the dimension is validated once, the batch goes to FAISS in a
+    single add and is persisted with a single write. Duplicate chunks are
+    skipped (see filter_new_chunks). Cosine stores keep normalized copies.
+    Returns the number of vectors added.
+    """
+    global index, EMBEDDING_DIM, generation
+
+    vec_np = np.ascontiguousarray(vectors, dtype="float32")
+    if vec_np.ndim != 2:
+        raise ValueError(f"Expected a 2-D matrix of embeddings, got shape {vec_np.shape}.")
+    if vec_np.shape[0] != len(metadata_items):
+        raise ValueError(f"Got {vec_np.shape[0]} embeddings but {len(metadata_items)} metadata items.")
+    if vec_np.shape[0] == 0:
+        return 0
+
+    _ensure_loaded()
+    vec_np = _prepare(vec_np)
+    snapshot = PERSISTENCE_MODE == "snapshot"
+    # Snapshot writes take _compaction_lock first, in the same order as compact_vector_store.
+    with (_compaction_lock if snapshot else nullcontext()), _lock:
+        # Auto-init index if empty
+        if index is None:
+            init_index(vec_np.shape[1])
+        elif vec_np.shape[1] != EMBEDDING_DIM:
+            raise ValueError(f"Embedding dimension {vec_np.shape[1]} "
+                             f"does not match index dimension {EMBEDDING_DIM}.")
+        if DEDUP:
+            keep = _new_rows(vec_np, metadata_items)
+            if not keep.all():
+                vec_np = vec_np[keep]
+                metadata_items = [item for item, k in zip(metadata_items, keep) if k]
+                if vec_np.shape[0] == 0:
+                    return 0
+        _ensure_writable()
+
+        # Metadata is committed first; rows without a vector are dropped on load.
+        start_id = index.ntotal
+        metadata_store.put_many(start_id, metadata_items)
+
+        if snapshot:
+            index.add(vec_np)
+            _write_snapshot()
+        else:
+            _append_wal([_encode_wal_record(start_id + i, row) for i, row in enumerate(vec_np)])
+            index.add(vec_np)
+        generation += 1
+
+    if _wal_records >= COMPACT_EVERY:
+        _schedule_compaction()
+    _maybe_promote()
+    return vec_np.shape[0]
 
 
 def add_document_embedding(embedding_vector, metadata_item):
     """
     Adds a new document embedding and its metadata to the store.
     Automatically initializes index if needed.
+    The add is durable once this returns.
     """
-    global index, metadata, EMBEDDING_DIM
-
-    vec_np = np.array([embedding_vector], dtype='float32')
+    add_document_embeddings([embedding_vector], [metadata_item])
 
-    # Auto-init index if empty
-    if index is None:
-        init_index(vec_np.shape[1])
-    elif vec_np.shape[1] != EMBEDDING_DIM:
-        raise ValueError(f"Embedding dimension {vec_np.shape[1]} "
-                         f"does not match index dimension {EMBEDDING_DIM}.")
 
-    index.add(vec_np)
-    metadata.append(metadata_item)
-    save_vector_store()
+def clear_vector_store():
+    """Deletes the persisted store files and resets the in-memory index."""
+    global index, EMBEDDING_DIM, _wal_records, _loaded, _index_mmapped, generation, metric
+    with _compaction_lock, _lock:
+        metadata_store.close_store()
+        paths = [VECTOR_STORE_INDEX_FILE, VECTOR_STORE_META_FILE, VECTOR_STORE_WAL_FILE]
+        for path in paths + metadata_store.database_files(VECTOR_STORE_META_DB):
+            if os.path.exists(path):
+                os.remove(path)
+        metadata_store.open_store(VECTOR_STORE_META_DB)
+        metric = DEFAULT_METRIC
+        metadata_store.set_setting("metric", metric)
+        index = None
+        EMBEDDING_DIM = None
+        _wal_records = 0
+        _loaded = True
+        _index_mmapped = False
+        generation += 1
 
 
-def search_similar(embedding_vector, top_k=3):
-    """Search for top_k closest items to the given embedding."""
-    if index is None or index.ntotal == 0:
-        return []
-
-    query_np = np.array([embedding_vector], dtype='float32')
-    distances, indices = index.search(query_np, top_k)
+def search_similar(embedding_vector, top_k=3, include_content=True):
+    """
+    Search for top_k closest items to the given embedding, best first.
+    Each result has "score" (higher is more similar: the cosine similarity,
+    or the negated squared L2 distance for l2 stores) and "distance"
+    (1 - cosine similarity, or the squared L2 distance).
+    Only the returned rows are read from the metadata store; pass
+    include_content=False to skip loading chunk text.
+    """
+    _ensure_loaded()
+    # FAISS indexes must not be searched while another thread adds to them.
+    with _lock:
+        if index is None or index.ntotal == 0:
+            return []
+        query_np = _prepare([embedding_vector])
+        values, indices = index.search(query_np, top_k)
+        hits = [(int(idx), float(value)) for value, idx in zip(values[0], indices[0]) if idx != -1]
+        rows = metadata_store.get_many([idx for idx, _ in hits], include_content=include_content)
 
     results = []
-    for dist, idx in zip(distances[0], indices[0]):
-        if idx != -1 and idx < len(metadata):
+    for idx, value in hits:
+        if idx in rows:
             results.append({
-                "metadata": metadata[idx],
-                "distance": float(dist)
+                "metadata": rows[idx],
+                "score": value if metric == "cosine" else -value,
+                "distance": 1 - value if metric == "cosine" else value,
             })
     return results
 
 
-# Load store at import
-load_vector_store()
+def _near_duplicate_rows(vectors, near_distance, batch_size=1024):
+    """Indices of rows within near_distance (squared L2) of an earlier kept row."""
+    kept_index = faiss.IndexFlatL2(vectors.shape[1])
+    drop = []
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        if kept_index.ntotal:
+            distances, _ = kept_index.search(batch, 1)
+            near_kept = distances[:, 0] <= near_distance
+        else:
+            near_kept = np.zeros(len(batch), dtype=bool)
+        # Within the batch, compare each row to the earlier rows that survive.
+        pairwise = faiss.pairwise_distances(batch, batch)
+        survivors = []
+        for i in range(len(batch)):
+            if near_kept[i] or any(pairwise[i, j] <= near_distance for j in survivors):
+                drop.append(start + i)
+            else:
+                survivors.append(i)
+        kept_index.add(batch[survivors])
+    return drop
+
+
+def deduplicate_store(near_distance=None):
+    """
+    One-off cleanup of an existing store: keeps the first copy of every chunk
+    (by normalized content hash, plus near-duplicate vectors when
+    near_distance is given), renumbers the rest and rewrites the snapshot.
+    The previous index and metadata database are kept as *.bak files.
+    Run it with the API stopped. Returns (vectors before, vectors after).
+    """
+    global index, _wal_records, _index_mmapped, generation
+    _ensure_loaded()
+    compact_vector_store()
+    with _compaction_lock, _lock:
+        if index is None or index.ntotal == 0:
+            return 0, 0
+        total = index.ntotal
+        vectors = _reconstruct(index, 0, total)
+        rows = metadata_store.all_items()
+
+        keep = np.ones(total, dtype=bool)
+        seen = set()
+        for row_id, _, h in rows:
+            if h is not None:
+                keep[row_id] = h not in seen
+                seen.add(h)
+        if near_distance:
+            candidates = np.flatnonzero(keep)
+            keep[candidates[_near_duplicate_rows(vectors[candidates], near_distance)]] = False
+        if keep.all():
+            return total, total
+
+        new_index = build_index(_index_type(index), vectors[keep])
+        items = [item for row_id, item, _ in rows if keep[row_id]]
+
+        shutil.copyfile(VECTOR_STORE_INDEX_FILE, VECTOR_STORE_INDEX_FILE + ".bak")
+        # Rows may still sit in the -wal file, so copy through SQLite rather than the main file.
+        metadata_store.backup(VECTOR_STORE_META_DB + ".bak")
+        _write_file_atomic(VECTOR_STORE_INDEX_FILE, faiss.serialize_index(new_index).tobytes())
+        metadata_store.replace_all(items)
+        if os.path.exists(VECTOR_STORE_WAL_FILE):
+            os.remove(VECTOR_STORE_WAL_FILE)
+        index = new_index
+        _index_mmapped = False
+        _wal_records = 0
+        generation += 1
+        return total, new_index.ntotal
+
+
+def _index_type(source):
+    """Index type to rebuild `source` as: flat stays flat, anything else becomes INDEX_TYPE."""
+    return "flat" if isinstance(source, faiss.IndexFlat) else INDEX_TYPE
+
+
+def convert_metric(new_metric):
+    """
+    Rewrites the store for another metric ("cosine" or "l2"): rebuilds the
+    index from its vectors (normalized for cosine) and records the metric.
+    Ids and metadata are unchanged; the previous index is kept as a *.bak
+    file. Run it with the API stopped. Returns True if the store changed.
+    """
+    global index, _wal_records, _index_mmapped, generation, metric
+    _faiss_metric(new_metric)
+    _ensure_loaded()
+    compact_vector_store()
+    with _compaction_lock, _lock:
+        if new_metric == metric:
+            return False
+        metric = new_metric
+        metadata_store.set_setting("metric", metric)
+        generation += 1
+        if index is None or index.ntotal == 0:
+            index = None
+            return True
+
+        vectors = _prepare(_reconstruct(index, 0, index.ntotal))
+        new_index = build_index(_index_type(index), vectors)
+        shutil.copyfile(VECTOR_STORE_INDEX_FILE, VECTOR_STORE_INDEX_FILE + ".bak")
+        _write_file_atomic(VECTOR_STORE_INDEX_FILE, faiss.serialize_index(new_index).tobytes())
+        if os.path.exists(VECTOR_STORE_WAL_FILE):
+            os.remove(VECTOR_STORE_WAL_FILE)
+        index = new_index
+        _index_mmapped = False
+        _wal_records = 0
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance commands for the local vector store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dedup = commands.add_parser("dedup", help="Remove duplicate chunks and compact the store.")
+    dedup.add_argument("--near-distance", type=float, default=0,
+                       help="also drop vectors within this squared L2 distance of a kept one")
+    set_metric = commands.add_parser("set-metric", help="Rebuild the index for another distance metric.")
+    set_metric.add_argument("metric", choices=METRICS)
+    args = parser.parse_args()
+
+    if args.command == "set-metric":
+        changed = convert_metric(args.metric)
+        print(f"Vector store metric is now '{metric}'{'' if changed else ' (unchanged)'}.")
+    elif args.command == "dedup":
+        before, after = deduplicate_store(args.near_distance)
+        print(f"Deduplicated vector store: {before} -> {after} vectors ({before - after} removed).")
@@ -322,8 +322,16 @@ function App() {
         body: formData,
       });
       if (!res.ok) throw new Error("Upload failed");
-      alert("Document uploaded and processed!");
       e.target.value = null;
+      const { job_id } = await res.json();
+      // Ingestion runs in the background; poll until the job finishes.
+      let job = { status: "queued" };
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = await (await fetch(`${BACKEND_URL}/jobs/${job_id}`)).json();
+      }
+      if (job.status !== "done") throw new Error(`Processing failed: ${job.errors.join("; ")}`);
+      alert("Document uploaded and processed!");
     } catch (err) {
       alert(err.message);
     }